@@ -1,78 +1,287 @@
-# Librerías para generar datos sintéticos
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import os
-
-def generar_datos_sinteticos(n_muestras=10000, n_maquinas=10):
-    """
-    Genera datos sintéticos para simular sensores de equipos industriales
-    """
-    print("🔧 Generando datos sintéticos...")
-    
-    np.random.seed(42)
-    datos = []
-    fecha_actual = datetime(2024, 1, 1)
-    
-    for id_maquina in range(1, n_maquinas + 1):
-        # Vida útil de cada máquina
-        vida_util = np.random.normal(1000, 200)
-        vida_actual = 0
-        
-        for _ in range(n_muestras // n_maquinas):
-            vida_actual += 1
-            tiempo_desde_mantenimiento = vida_actual
-            
-            # Factor de degradación progresiva
-            degradacion = (vida_actual / vida_util) * 3.0
-            
-            # Generar lecturas de sensores con ruido y tendencia
-            vibracion_base = np.random.normal(2.0, 0.2)
-            temperatura_base = np.random.normal(75, 5)
-            presion_base = np.random.normal(100, 10)
-            corriente_base = np.random.normal(15, 2)
-            
-            vibracion = max(0, vibracion_base + degradacion + np.random.normal(0, 0.1))
-            temperatura = max(0, temperatura_base + degradacion * 5 + np.random.normal(0, 1))
-            presion = max(0, presion_base + degradacion * 8 + np.random.normal(0, 2))
-            corriente = max(0, corriente_base + degradacion * 2 + np.random.normal(0, 0.5))
-            
-            # Determinar falla inminente (target variable)
-            falla_inminente = int(
-                (vibracion > 4.5) or 
-                (temperatura > 95) or 
-                (presion > 150) or
-                (corriente > 25) or
-                (vida_actual > vida_util * 0.9)
-            )
-            
-            datos.append({
-                'fecha_hora': fecha_actual,
-                'id_maquina': f'MAQ_{id_maquina:02d}',
-                'vibracion': vibracion,
-                'temperatura': temperatura,
-                'presion': presion,
-                'corriente': corriente,
-                'tiempo_desde_mantenimiento': tiempo_desde_mantenimiento,
-                'falla_inminente': falla_inminente,
-                'vida_util_restante': max(0, vida_util - vida_actual)
-            })
-            
-            fecha_actual += timedelta(hours=1)
-    
-    df = pd.DataFrame(datos)
-    
-    # Crear directorio si no existe
-    os.makedirs('../data', exist_ok=True)
-    
-    # Guardar datos
-    df.to_csv('../data/datos_sinteticos.csv', index=False)
-    print(f"✅ Datos guardados: {df.shape[0]} registros, {df.shape[1]} columnas")
-    print(f"📊 Distribución de fallas: {df['falla_inminente'].value_counts().to_dict()}")
-    
-    return df
-
-if __name__ == "__main__":
-    df = generar_datos_sinteticos()
-    print("\nPrimeras 5 filas:")
-    print(df.head())
\ No newline at end of file
+# Librerías para generar datos sintéticos
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from multiprocessing import Pool
+import argparse
+import os
+import shutil
+
+from formato_datos import (EscritorArrow, convertir_tipos, guardar_dataset,
+                           RUTA_DATOS_CSV, RUTA_DATOS_ARROW)
+
+FECHA_INICIO = datetime(2024, 1, 1)
+
+def generar_trayectoria_maquina(id_maquina, n_pasos, rng, fecha_inicio):
+    """
+    Genera la trayectoria completa de una máquina como arrays de NumPy
+    (curva de degradación, ruido, falla inminente y vida útil restante)
+    """
+    # Vida útil de la máquina
+    vida_util = rng.normal(1000, 200)
+    vida_actual = np.arange(1, n_pasos + 1)
+
+    # Factor de degradación progresiva
+    degradacion = (vida_actual / vida_util) * 3.0
+
+    # Lecturas base de los sensores
+    vibracion_base = rng.normal(2.0, 0.2, n_pasos)
+    temperatura_base = rng.normal(75, 5, n_pasos)
+    presion_base = rng.normal(100, 10, n_pasos)
+    corriente_base = rng.normal(15, 2, n_pasos)
+
+    # Lecturas con tendencia y ruido
+    vibracion = np.maximum(0, vibracion_base + degradacion + rng.normal(0, 0.1, n_pasos))
+    temperatura = np.maximum(0, temperatura_base + degradacion * 5 + rng.normal(0, 1, n_pasos))
+    presion = np.maximum(0, presion_base + degradacion * 8 + rng.normal(0, 2, n_pasos))
+    corriente = np.maximum(0, corriente_base + degradacion * 2 + rng.normal(0, 0.5, n_pasos))
+
+    # Determinar falla inminente (target variable)
+    falla_inminente = (
+        (vibracion > 4.5) |
+        (temperatura > 95) |
+        (presion > 150) |
+        (corriente > 25) |
+        (vida_actual > vida_util * 0.9)
+    ).astype(int)
+
+    # Las fechas continúan donde terminó la máquina anterior
+    desplazamiento = (id_maquina - 1) * n_pasos
+    fecha_hora = (np.datetime64(fecha_inicio, 'ns')
+                  + (desplazamiento + np.arange(n_pasos)).astype('timedelta64[h]'))
+
+    return {
+        'fecha_hora': fecha_hora,
+        'id_maquina': np.full(n_pasos, f'MAQ_{id_maquina:02d}', dtype=object),
+        'vibracion': vibracion,
+        'temperatura': temperatura,
+        'presion': presion,
+        'corriente': corriente,
+        'tiempo_desde_mantenimiento': vida_actual,
+        'falla_inminente': falla_inminente,
+        'vida_util_restante': np.maximum(0, vida_util - vida_actual)
+    }
+
+def rng_maquina(semilla, id_maquina):
+    """
+    Flujo aleatorio independiente para una máquina, derivado de la semilla raíz
+    """
+    return np.random.default_rng(np.random.SeedSequence(semilla, spawn_key=(id_maquina,)))
+
+def _generar_maquina(args):
+    """
+    Tarea del pool de procesos: genera la trayectoria de una máquina
+    """
+    id_maquina, n_pasos, semilla = args
+    return generar_trayectoria_maquina(id_maquina, n_pasos, rng_maquina(semilla, id_maquina),
+                                       FECHA_INICIO)
+
+def generar_datos_sinteticos(n_muestras=10000, n_maquinas=10, semilla=42, n_procesos=1):
+    """
+    Genera datos sintéticos para simular sensores de equipos industriales.
+    Cada máquina usa su propio flujo aleatorio, por lo que el resultado es
+    idéntico sea cual sea el número de procesos
+    """
+    print("🔧 Generando datos sintéticos...")
+
+    n_pasos = n_muestras // n_maquinas
+    tareas = [(id_maquina, n_pasos, semilla) for id_maquina in range(1, n_maquinas + 1)]
+
+    # Una trayectoria columnar por máquina, repartidas entre procesos
+    if n_procesos > 1:
+        with Pool(n_procesos) as pool:
+            trayectorias = pool.map(_generar_maquina, tareas,
+                                    chunksize=max(1, n_maquinas // (n_procesos * 4)))
+    else:
+        trayectorias = [_generar_maquina(tarea) for tarea in tareas]
+
+    df = pd.DataFrame({
+        columna: np.concatenate([t[columna] for t in trayectorias])
+        for columna in trayectorias[0]
+    })
+    del trayectorias
+
+    # Crear directorio si no existe
+    os.makedirs('../data', exist_ok=True)
+
+    # Guardar datos (CSV legible y formato binario tipado para las demás etapas)
+    df.to_csv(RUTA_DATOS_CSV, index=False)
+    guardar_dataset(df, RUTA_DATOS_ARROW)
+    print(f"✅ Datos guardados: {df.shape[0]} registros, {df.shape[1]} columnas")
+    print(f"📊 Distribución de fallas: {df['falla_inminente'].value_counts().to_dict()}")
+
+    return df
+
+def _iterar_trayectorias(tareas, n_procesos):
+    """
+    Produce las trayectorias en orden, por tandas acotadas para que el pool
+    no acumule más resultados de los que el escritor puede consumir
+    """
+    if n_procesos <= 1:
+        for tarea in tareas:
+            yield _generar_maquina(tarea)
+        return
+
+    tamano_tanda = n_procesos * 4
+    with Pool(n_procesos) as pool:
+        for inicio in range(0, len(tareas), tamano_tanda):
+            yield from pool.imap(_generar_maquina, tareas[inicio:inicio + tamano_tanda])
+
+class EscritorCSV:
+    """
+    Escribe bloques en un único CSV, añadiendo al final del archivo
+    """
+    def __init__(self, ruta_salida):
+        self.ruta_salida = ruta_salida
+        self.primer_bloque = True
+
+    def escribir(self, df):
+        df.to_csv(self.ruta_salida, mode='w' if self.primer_bloque else 'a',
+                  header=self.primer_bloque, index=False)
+        self.primer_bloque = False
+
+    def cerrar(self):
+        pass
+
+class EscritorParquet:
+    """
+    Escribe bloques en Parquet: un único archivo por grupos de filas, o un
+    dataset particionado por 'id_maquina' o por 'fecha' (día). Una salida
+    anterior en la misma ruta se elimina para no mezclar ejecuciones
+    """
+    def __init__(self, ruta_salida, particion=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if os.path.isdir(ruta_salida):
+            print(f"🗑️  Eliminando la salida anterior en {ruta_salida}")
+            shutil.rmtree(ruta_salida)
+        elif os.path.exists(ruta_salida):
+            os.remove(ruta_salida)
+
+        self.pa = pa
+        self.pq = pq
+        self.ruta_salida = ruta_salida
+        self.particion = particion
+        self.n_bloque = 0
+        self.escritor = None
+
+    def escribir(self, df):
+        if self.particion == 'fecha':
+            df = df.assign(fecha=df['fecha_hora'].dt.strftime('%Y-%m-%d'))
+
+        tabla = self.pa.Table.from_pandas(convertir_tipos(df), preserve_index=False)
+
+        if self.particion:
+            self.pq.write_to_dataset(
+                tabla, self.ruta_salida, partition_cols=[self.particion],
+                basename_template=f'bloque-{self.n_bloque:06d}-{{i}}.parquet'
+            )
+        else:
+            if self.escritor is None:
+                self.escritor = self.pq.ParquetWriter(self.ruta_salida, tabla.schema)
+            self.escritor.write_table(tabla)
+
+        self.n_bloque += 1
+
+    def cerrar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+
+def generar_datos_streaming(ruta_salida, n_muestras=10000, n_maquinas=10, semilla=42,
+                            n_procesos=1, formato='csv', particion=None,
+                            filas_por_bloque=1_000_000):
+    """
+    Genera los datos sintéticos y los escribe por bloques a medida que se
+    producen las máquinas, con memoria acotada por 'filas_por_bloque'
+    sin importar el tamaño total. Produce los mismos datos que
+    generar_datos_sinteticos con la misma semilla; los formatos binarios
+    ('parquet', 'arrow') usan el esquema tipado de formato_datos
+    """
+    print(f"🔧 Generando datos sintéticos en streaming ({formato})...")
+
+    if formato == 'csv':
+        if particion:
+            raise ValueError("El formato CSV no admite particiones")
+        escritor = EscritorCSV(ruta_salida)
+    elif formato == 'parquet':
+        if particion not in (None, 'id_maquina', 'fecha'):
+            raise ValueError(f"Partición no soportada: {particion}")
+        escritor = EscritorParquet(ruta_salida, particion)
+    elif formato == 'arrow':
+        if particion:
+            raise ValueError("El formato Arrow no admite particiones")
+        escritor = EscritorArrow(ruta_salida,
+                                 [f'MAQ_{id_maquina:02d}' for id_maquina in range(1, n_maquinas + 1)])
+    else:
+        raise ValueError(f"Formato no soportado: {formato}")
+
+    directorio = os.path.dirname(ruta_salida)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+
+    n_pasos = n_muestras // n_maquinas
+    tareas = [(id_maquina, n_pasos, semilla) for id_maquina in range(1, n_maquinas + 1)]
+
+    pendientes = []
+    filas_pendientes = 0
+    total_registros = 0
+    total_fallas = 0
+
+    def volcar():
+        df = pd.DataFrame({
+            columna: np.concatenate([t[columna] for t in pendientes])
+            for columna in pendientes[0]
+        })
+        escritor.escribir(df)
+        pendientes.clear()
+
+    try:
+        for trayectoria in _iterar_trayectorias(tareas, n_procesos):
+            pendientes.append(trayectoria)
+            filas_pendientes += n_pasos
+            total_registros += n_pasos
+            total_fallas += int(trayectoria['falla_inminente'].sum())
+
+            if filas_pendientes >= filas_por_bloque:
+                volcar()
+                filas_pendientes = 0
+
+        if pendientes:
+            volcar()
+    finally:
+        escritor.cerrar()
+
+    resumen = {
+        'registros': total_registros,
+        'fallas': {0: total_registros - total_fallas, 1: total_fallas}
+    }
+    print(f"✅ Datos guardados en {ruta_salida}: {total_registros} registros")
+    print(f"📊 Distribución de fallas: {resumen['fallas']}")
+
+    return resumen
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generador de datos sintéticos de sensores")
+    parser.add_argument('--muestras', type=int, default=10000)
+    parser.add_argument('--maquinas', type=int, default=10)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--procesos', type=int, default=1,
+                        help="Procesos para repartir las máquinas (0 = todos los núcleos)")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Escribir por bloques sin cargar todo el dataset en memoria")
+    parser.add_argument('--formato', choices=['csv', 'parquet', 'arrow'], default='csv')
+    parser.add_argument('--particion', choices=['id_maquina', 'fecha'], default=None)
+    parser.add_argument('--salida', default=None)
+    parser.add_argument('--filas-por-bloque', type=int, default=1_000_000)
+    args = parser.parse_args()
+    n_procesos = args.procesos or os.cpu_count()
+
+    if args.streaming:
+        generar_datos_streaming(args.salida or f'../data/datos_sinteticos.{args.formato}',
+                                args.muestras, args.maquinas, args.semilla, n_procesos,
+                                args.formato, args.particion, args.filas_por_bloque)
+    else:
+        df = generar_datos_sinteticos(args.muestras, args.maquinas, args.semilla, n_procesos)
+        print("\nPrimeras 5 filas:")
+        print(df.head())
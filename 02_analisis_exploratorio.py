@@ -1,19 +1,84 @@
 # Librerías para análisis exploratorio
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
-import os
+import argparse
+from multiprocessing import Pool
+from functools import partial
+from itertools import islice
 
-def analisis_exploratorio():
+from formato_datos import cargar_dataset, iterar_bloques
+from estadisticas_streaming import PerfilStreaming, perfilar_bloque
+
+def lttb(x, y, n_puntos):
+    """
+    Largest-Triangle-Three-Buckets: índices de los 'n_puntos' puntos que
+    mejor conservan la forma visual de la serie (x numérico y creciente)
+    """
+    n = len(x)
+    if n_puntos >= n or n_puntos < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    bordes = np.linspace(1, n - 1, n_puntos - 1).astype(np.int64)
+    indices = np.empty(n_puntos, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+
+    anterior = 0
+    for i in range(n_puntos - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        # Promedio del siguiente bucket (o el último punto)
+        sig_inicio, sig_fin = fin, bordes[i + 2] if i + 2 < len(bordes) else n
+        x_medio = x[sig_inicio:sig_fin].mean()
+        y_medio = y[sig_inicio:sig_fin].mean()
+        # Punto del bucket que forma el triángulo de mayor área
+        areas = np.abs((x[anterior] - x_medio) * (y[inicio:fin] - y[anterior]) -
+                       (x[anterior] - x[inicio:fin]) * (y_medio - y[anterior]))
+        anterior = inicio + int(np.argmax(areas))
+        indices[i + 1] = anterior
+
+    return indices
+
+def muestreo_estratificado(df, max_puntos, columna='falla_inminente', semilla=42):
+    """
+    Submuestra acotada a 'max_puntos' filas que conserva todas las fallas
+    mientras quepan en la mitad del cupo (si no, también se submuestrean y
+    se avisa); el resto se completa con filas normales elegidas al azar
+    """
+    if len(df) <= max_puntos:
+        return df
+
+    rng = np.random.default_rng(semilla)
+    es_falla = df[columna].to_numpy() == 1
+    idx_fallas = np.flatnonzero(es_falla)
+    idx_normales = np.flatnonzero(~es_falla)
+
+    cupo_fallas = min(len(idx_fallas), max(max_puntos // 2, max_puntos - len(idx_normales)))
+    cupo_normales = min(len(idx_normales), max_puntos - cupo_fallas)
+    if cupo_fallas < len(idx_fallas):
+        print(f"⚠️  Muestra con {cupo_fallas} de {len(idx_fallas)} fallas "
+              f"(usar --max-puntos {len(idx_fallas) * 2} o --exacto para verlas todas)")
+        idx_fallas = rng.choice(idx_fallas, cupo_fallas, replace=False)
+    idx_normales = rng.choice(idx_normales, cupo_normales, replace=False)
+
+    return df.iloc[np.sort(np.concatenate([idx_fallas, idx_normales]))]
+
+def analisis_exploratorio(streaming=False, filas_por_bloque=1_000_000, n_procesos=1,
+                          exacto=False, max_puntos=20_000, max_puntos_serie=1_000):
     """
-    Realiza análisis exploratorio de los datos generados
+    Realiza análisis exploratorio de los datos generados. Salvo con
+    exacto=True, la serie temporal y el scatter se submuestrean antes de
+    dibujar para acotar el número de puntos
     """
+    if streaming:
+        return analisis_exploratorio_streaming(filas_por_bloque=filas_por_bloque,
+                                               n_procesos=n_procesos)
+
     print("📊 Realizando análisis exploratorio...")
     
-    # Cargar datos
-    df = pd.read_csv('../data/datos_sinteticos.csv')
-    df['fecha_hora'] = pd.to_datetime(df['fecha_hora'])
+    # Cargar datos (formato binario tipado si está disponible)
+    df = cargar_dataset()
     
     # Configurar estilo de gráficos
     plt.style.use('seaborn-v0_8')
@@ -41,22 +106,29 @@ def analisis_exploratorio():
     
     # 3. Tasa de fallas por máquina
     plt.subplot(3, 3, 6)
-    tasa_fallas = df.groupby('id_maquina')['falla_inminente'].mean().sort_values()
+    tasa_fallas = df.groupby('id_maquina', observed=True)['falla_inminente'].mean().sort_values()
     tasa_fallas.plot(kind='barh', color='skyblue')
     plt.title('Tasa de Fallas por Máquina')
     plt.xlabel('Tasa de Fallas')
     plt.grid(axis='x', alpha=0.3)
     
-    # 4. Evolución temporal de vibración (ejemplo con una máquina)
+    # 4. Evolución temporal de vibración (serie completa de una máquina,
+    # reducida con LTTB a 'max_puntos_serie' puntos)
     plt.subplot(3, 3, 7)
-    maq_ejemplo = df[df['id_maquina'] == 'MAQ_01'].tail(200)
-    plt.plot(maq_ejemplo['fecha_hora'], maq_ejemplo['vibracion'], 
-             label='Vibración', color='red', alpha=0.7)
-    plt.plot(maq_ejemplo['fecha_hora'], maq_ejemplo['temperatura']/20, 
-             label='Temperatura/20', color='orange', alpha=0.7)
-    
-    # Resaltar puntos con falla
-    fallas = maq_ejemplo[maq_ejemplo['falla_inminente'] == 1]
+    maq_ejemplo = df[df['id_maquina'] == 'MAQ_01'].sort_values('fecha_hora')
+    tiempos = maq_ejemplo['fecha_hora'].to_numpy()
+    for var, escala, etiqueta, color in (('vibracion', 1, 'Vibración', 'red'),
+                                         ('temperatura', 20, 'Temperatura/20', 'orange')):
+        valores = maq_ejemplo[var].to_numpy() / escala
+        idx = (np.arange(len(valores)) if exacto else
+               lttb(tiempos.astype(np.int64), valores, max_puntos_serie))
+        if var == 'vibracion':
+            idx_vibracion = idx
+        plt.plot(tiempos[idx], valores[idx], label=etiqueta, color=color, alpha=0.7)
+    
+    # Resaltar puntos con falla (de los dibujados)
+    fallas = maq_ejemplo.iloc[idx_vibracion]
+    fallas = fallas[fallas['falla_inminente'] == 1]
     plt.scatter(fallas['fecha_hora'], fallas['vibracion'], 
                 color='red', s=50, zorder=5, label='Falla Inminente')
     
@@ -77,10 +149,11 @@ def analisis_exploratorio():
     plt.title('Distribución por Sensor y Estado de Falla')
     plt.xticks(rotation=45)
     
-    # 6. Scatter plot vibración vs temperatura
+    # 6. Scatter plot vibración vs temperatura (muestra estratificada)
     plt.subplot(3, 3, 9)
-    scatter = plt.scatter(df['vibracion'], df['temperatura'], 
-                         c=df['falla_inminente'], alpha=0.6, 
+    muestra = df if exacto else muestreo_estratificado(df, max_puntos)
+    scatter = plt.scatter(muestra['vibracion'], muestra['temperatura'], 
+                         c=muestra['falla_inminente'], alpha=0.6, 
                          cmap='viridis', s=30)
     plt.colorbar(scatter, label='Falla Inminente')
     plt.xlabel('Vibración')
@@ -99,5 +172,140 @@ def analisis_exploratorio():
     print(f"\n🎯 Balance de clases (Falla Inminente):")
     print(df['falla_inminente'].value_counts(normalize=True).map(lambda x: f"{x:.2%}"))
 
+def analisis_exploratorio_streaming(ruta=None, filas_por_bloque=1_000_000, n_procesos=1):
+    """
+    Análisis exploratorio por bloques con acumuladores fusionables, para
+    datasets más grandes que la memoria. Con n_procesos > 1 los bloques se
+    perfilan en paralelo y se fusionan
+    """
+    print("📊 Realizando análisis exploratorio (streaming)...")
+
+    variables = ['vibracion', 'temperatura', 'presion', 'corriente']
+    perfil = PerfilStreaming(variables)
+    bloques = iterar_bloques(ruta, filas_por_bloque=filas_por_bloque)
+
+    if n_procesos > 1:
+        # Por tandas acotadas: el pool no lee más bloques de los que procesa
+        tamano_tanda = n_procesos * 2
+        perfilar = partial(perfilar_bloque, variables=variables)
+        with Pool(n_procesos) as pool:
+            while True:
+                tanda = list(islice(bloques, tamano_tanda))
+                if not tanda:
+                    break
+                for parcial in pool.imap(perfilar, tanda):
+                    perfil.fusionar(parcial)
+    else:
+        for bloque in bloques:
+            perfil.actualizar(bloque)
+
+    # Configurar estilo de gráficos
+    plt.style.use('seaborn-v0_8')
+    sns.set_palette("husl")
+    colores = sns.color_palette("husl", 2)
+
+    # Crear figura con subplots
+    fig = plt.figure(figsize=(20, 15))
+
+    # 1. Distribución de variables numéricas (histogramas acumulados por clase)
+    for i, var in enumerate(variables, 1):
+        plt.subplot(3, 3, i)
+        bordes, conteos = perfil.histogramas[var].reagrupar()
+        for clase in (0, 1):
+            plt.stairs(conteos[clase], bordes, fill=True, alpha=0.6,
+                       color=colores[clase], label=str(clase))
+        plt.legend(title='falla_inminente')
+        plt.title(f'Distribución de {var.title()}')
+        plt.xlabel(var.title())
+
+    # 2. Matriz de correlación (covarianza acumulada)
+    plt.subplot(3, 3, 5)
+    correlaciones = perfil.momentos.correlacion()
+    mask = np.triu(np.ones_like(correlaciones, dtype=bool))
+    sns.heatmap(correlaciones, mask=mask, annot=True, cmap='coolwarm', center=0,
+                square=True, fmt='.2f', cbar_kws={"shrink": .8})
+    plt.title('Matriz de Correlación')
+
+    # 3. Tasa de fallas por máquina
+    plt.subplot(3, 3, 6)
+    perfil.tasa_fallas().plot(kind='barh', color='skyblue')
+    plt.title('Tasa de Fallas por Máquina')
+    plt.xlabel('Tasa de Fallas')
+    plt.grid(axis='x', alpha=0.3)
+
+    # 4. Evolución temporal de vibración (últimas filas de la máquina de ejemplo)
+    plt.subplot(3, 3, 7)
+    maq_ejemplo = perfil.serie_ejemplo
+    if maq_ejemplo is not None:
+        plt.plot(maq_ejemplo['fecha_hora'], maq_ejemplo['vibracion'],
+                 label='Vibración', color='red', alpha=0.7)
+        plt.plot(maq_ejemplo['fecha_hora'], maq_ejemplo['temperatura']/20,
+                 label='Temperatura/20', color='orange', alpha=0.7)
+        fallas = maq_ejemplo[maq_ejemplo['falla_inminente'] == 1]
+        plt.scatter(fallas['fecha_hora'], fallas['vibracion'],
+                    color='red', s=50, zorder=5, label='Falla Inminente')
+        plt.legend()
+    plt.title(f'Evolución Temporal - Máquina {perfil.maquina_ejemplo}')
+    plt.xlabel('Fecha')
+    plt.ylabel('Valores Normalizados')
+    plt.xticks(rotation=45)
+
+    # 5. Boxplot por estado de falla (cuartiles del sketch)
+    ax = plt.subplot(3, 3, 8)
+    for clase, desplazamiento in ((0, -0.2), (1, 0.2)):
+        cajas = [perfil.estadisticas_caja(var, clase) for var in variables]
+        ax.bxp(cajas, positions=np.arange(len(variables)) + desplazamiento, widths=0.35,
+               patch_artist=True, showfliers=False,
+               boxprops={'facecolor': colores[clase]})
+    ax.set_xticks(range(len(variables)))
+    ax.set_xticklabels(variables)
+    ax.set_xlabel('Sensor')
+    ax.set_ylabel('Valor')
+    plt.title('Distribución por Sensor y Estado de Falla')
+    plt.xticks(rotation=45)
+
+    # 6. Vibración vs temperatura (densidad acumulada, color = tasa de falla)
+    plt.subplot(3, 3, 9)
+    dispersion = perfil.dispersion
+    bordes_x, bordes_y = dispersion.bordes()
+    filas, columnas = np.nonzero(dispersion.conteos)
+    zona = (slice(filas.min(), filas.max() + 1), slice(columnas.min(), columnas.max() + 1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tasa = np.where(dispersion.conteos > 0, dispersion.fallas / dispersion.conteos, np.nan)
+    malla = plt.pcolormesh(bordes_x[filas.min():filas.max() + 2],
+                           bordes_y[columnas.min():columnas.max() + 2],
+                           tasa[zona].T, cmap='viridis')
+    plt.colorbar(malla, label='Falla Inminente')
+    plt.xlabel('Vibración')
+    plt.ylabel('Temperatura')
+    plt.title('Vibración vs Temperatura')
+    plt.grid(alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig('../data/analisis_exploratorio.png', dpi=300, bbox_inches='tight')
+    plt.show()
+
+    # Estadísticas descriptivas
+    print("\n📈 Estadísticas Descriptivas:")
+    print(perfil.describir())
+
+    print(f"\n🎯 Balance de clases (Falla Inminente):")
+    print(perfil.balance_clases().map(lambda x: f"{x:.2%}"))
+
+    return perfil
+
 if __name__ == "__main__":
-    analisis_exploratorio()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Análisis exploratorio de los datos de sensores")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Procesar por bloques con acumuladores (datasets mayores que la RAM)")
+    parser.add_argument('--filas-por-bloque', type=int, default=1_000_000)
+    parser.add_argument('--procesos', type=int, default=1)
+    parser.add_argument('--exacto', action='store_true',
+                        help="Dibujar todos los puntos sin submuestreo")
+    parser.add_argument('--max-puntos', type=int, default=20_000)
+    parser.add_argument('--max-puntos-serie', type=int, default=1_000,
+                        help="Puntos de la serie temporal de ejemplo tras la reducción LTTB")
+    args = parser.parse_args()
+
+    analisis_exploratorio(args.streaming, args.filas_por_bloque, args.procesos,
+                          args.exacto, args.max_puntos, args.max_puntos_serie)
\ No newline at end of file
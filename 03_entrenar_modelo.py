@@ -1,16 +1,105 @@
 # Librerías para entrenamiento de modelos
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, cross_val_score
+from sklearn.model_selection import train_test_split, cross_val_score, check_cv, ParameterGrid
+from sklearn.base import clone
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import (classification_report, confusion_matrix, 
-                           roc_auc_score, precision_recall_curve, auc)
+                           roc_auc_score, precision_recall_curve, auc, check_scoring)
 from xgboost import XGBClassifier
-import joblib
+import xgboost as xgb
+from joblib import Parallel, delayed
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import time
+import argparse
+from itertools import zip_longest
+
+from formato_datos import cargar_dataset, iterar_bloques, COLUMNAS_SENSORES
+from caracteristicas import caracteristicas_rolling, completar_caracteristicas
+from almacen_caracteristicas import AlmacenCaracteristicas
+from artefacto_modelo import guardar_artefacto
+from cascada_inferencia import entrenar_etapa_rapida, calibrar_cascada
+
+# Espacio de búsqueda para la selección con presupuesto (successive halving).
+# Los boosting usan muchas rondas con parada temprana sobre validación
+ESPACIO_BUSQUEDA = {
+    'Random Forest': (
+        lambda **p: RandomForestClassifier(random_state=42, n_jobs=-1, **p),
+        {'n_estimators': [100, 300], 'max_depth': [None, 12, 20], 'min_samples_leaf': [1, 5]}
+    ),
+    'Gradient Boosting': (
+        lambda **p: GradientBoostingClassifier(random_state=42, n_estimators=500,
+                                               n_iter_no_change=10, validation_fraction=0.1, **p),
+        {'learning_rate': [0.05, 0.1, 0.2], 'max_depth': [3, 5]}
+    ),
+    'XGBoost': (
+        lambda **p: XGBClassifier(random_state=42, eval_metric='logloss', n_estimators=1000,
+                                  early_stopping_rounds=20, **p),
+        {'learning_rate': [0.05, 0.1, 0.3], 'max_depth': [4, 6, 8], 'subsample': [0.8, 1.0]}
+    )
+}
+
+def _ajustar_tarea(modelo, X, y, indices_entrenamiento, indices_validacion, n_hilos):
+    """
+    Tarea del pool de entrenamiento: ajusta una copia del modelo y devuelve
+    el modelo ajustado (entrenamiento final) o la AUC del fold
+    """
+    modelo = clone(modelo)
+    if 'n_jobs' in modelo.get_params():
+        modelo.set_params(n_jobs=n_hilos)
+
+    if indices_validacion is None:
+        return modelo.fit(X, y)
+
+    modelo.fit(X[indices_entrenamiento], y[indices_entrenamiento])
+    puntuador = check_scoring(modelo, scoring='roc_auc')
+    return puntuador(modelo, X[indices_validacion], y[indices_validacion])
+
+CARACTERISTICAS_EXCLUIR = ['fecha_hora', 'id_maquina', 'falla_inminente', 'vida_util_restante']
+
+def _bloques_particionados(almacen, columnas, filas_por_bloque, fraccion_prueba, prueba, scaler=None):
+    """
+    Bloques (X, y) del almacén para el conjunto de entrenamiento o de prueba.
+    La partición es un hash de (id_maquina, fecha_hora): estable entre pasadas
+    y sin necesidad de ver todo el dataset
+    """
+    for bloque in almacen.iterar_bloques(filas_por_bloque):
+        hash_filas = pd.util.hash_pandas_object(bloque[['id_maquina', 'fecha_hora']], index=False)
+        es_prueba = (hash_filas.to_numpy() % 10_000) < fraccion_prueba * 10_000
+        seleccion = bloque[es_prueba if prueba else ~es_prueba]
+        if len(seleccion) == 0:
+            continue
+
+        X = seleccion[columnas].to_numpy(dtype=np.float64)
+        if scaler is not None:
+            X = scaler.transform(X)
+        yield X, seleccion['falla_inminente'].to_numpy()
+
+class IteradorBloquesXGB(xgb.DataIter):
+    """
+    Fuente de datos por bloques para la memoria externa de XGBoost
+    """
+    def __init__(self, almacen, columnas, filas_por_bloque, fraccion_prueba, scaler, cache_prefix):
+        self.argumentos = (almacen, columnas, filas_por_bloque, fraccion_prueba)
+        self.scaler = scaler
+        self.bloques = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self.bloques is None:
+            self.bloques = _bloques_particionados(*self.argumentos, prueba=False, scaler=self.scaler)
+        try:
+            X, y = next(self.bloques)
+        except StopIteration:
+            return False
+        input_data(data=X, label=y)
+        return True
+
+    def reset(self):
+        self.bloques = None
 
 class EntrenadorModelo:
     def __init__(self):
@@ -22,6 +111,8 @@ class EntrenadorModelo:
         self.mejor_modelo = None
         self.scaler = StandardScaler()
         self.resultados = {}
+        self.cascada = None
+        self.partes_almacen = None
     
     def ingenieria_caracteristicas(self, df):
         """
@@ -29,50 +120,35 @@ class EntrenadorModelo:
         """
         print("🔧 Realizando ingeniería de características...")
         
-        df_features = df.copy()
-        
-        # Características estadísticas rolling por máquina
-        for col in ['vibracion', 'temperatura', 'presion', 'corriente']:
-            # Estadísticas en ventana temporal
-            df_features[f'{col}_media_10'] = df.groupby('id_maquina')[col].rolling(10).mean().values
-            df_features[f'{col}_std_10'] = df.groupby('id_maquina')[col].rolling(10).std().values
-            df_features[f'{col}_max_10'] = df.groupby('id_maquina')[col].rolling(10).max().values
-            df_features[f'{col}_min_10'] = df.groupby('id_maquina')[col].rolling(10).min().values
-            
-            # Tendencia (derivada)
-            df_features[f'{col}_tendencia'] = df.groupby('id_maquina')[col].diff(5)
-        
-        # Índice de degradación compuesto
-        df_features['indice_degradacion'] = (
-            df_features['vibracion'] / df_features['vibracion'].mean() +
-            df_features['temperatura'] / df_features['temperatura'].mean() +
-            df_features['presion'] / df_features['presion'].mean() +
-            df_features['corriente'] / df_features['corriente'].mean()
-        )
+        # Estadísticas rolling y tendencia de los cuatro sensores en una pasada por máquina
+        df_features = pd.concat([df, caracteristicas_rolling(df)], axis=1)
         
-        # Características de tiempo
-        df_features['hora'] = pd.to_datetime(df_features['fecha_hora']).dt.hour
-        df_features['dia_semana'] = pd.to_datetime(df_features['fecha_hora']).dt.dayofweek
-        
-        # Llenar valores NaN
-        df_features = df_features.fillna(method='bfill').fillna(method='ffill')
+        # Índice de degradación compuesto, características de tiempo y relleno de NaN
+        self.medias_sensores = {col: df_features[col].mean() for col in COLUMNAS_SENSORES}
+        df_features = completar_caracteristicas(df_features, self.medias_sensores)
         
         print(f"✅ Características creadas. Total features: {len([col for col in df_features.columns if col not in ['fecha_hora', 'id_maquina', 'falla_inminente', 'vida_util_restante']])}")
         
         return df_features
     
-    def preparar_datos(self, df):
+    def preparar_datos(self, df, almacen=None):
         """
-        Prepara los datos para entrenamiento
+        Prepara los datos para entrenamiento. Con un AlmacenCaracteristicas
+        solo se calculan las características de las filas nuevas
         """
         print("📋 Preparando datos para entrenamiento...")
         
         # Aplicar ingeniería de características
-        df_features = self.ingenieria_caracteristicas(df)
+        if almacen is not None:
+            almacen.actualizar(df)
+            df_features = almacen.cargar()
+            self.medias_sensores = almacen.medias_sensores()
+            self.partes_almacen = len(almacen.estado['partes'])
+        else:
+            df_features = self.ingenieria_caracteristicas(df)
         
         # Definir características y target
-        caracteristicas_excluir = ['fecha_hora', 'id_maquina', 'falla_inminente', 'vida_util_restante']
-        self.columnas_caracteristicas = [col for col in df_features.columns if col not in caracteristicas_excluir]
+        self.columnas_caracteristicas = [col for col in df_features.columns if col not in CARACTERISTICAS_EXCLUIR]
         
         X = df_features[self.columnas_caracteristicas]
         y = df_features['falla_inminente']
@@ -91,17 +167,60 @@ class EntrenadorModelo:
         
         return X_entrenamiento_esc, X_prueba_esc, y_entrenamiento, y_prueba
     
-    def entrenar_modelos(self, X_entrenamiento, X_prueba, y_entrenamiento, y_prueba):
+    def _entrenar_en_paralelo(self, X_entrenamiento, y_entrenamiento, n_procesos, cv=5):
+        """
+        Reparte los ajustes finales y los folds de validación cruzada de todos
+        los modelos en un pool de procesos con un único presupuesto de CPU.
+        La matriz se comparte por memory-mapping y los folds son los mismos
+        que usa cross_val_score, por lo que el resultado es idéntico al serie
+        """
+        X = np.asarray(X_entrenamiento)
+        y = np.asarray(y_entrenamiento)
+        folds = list(check_cv(cv, y, classifier=True).split(X, y))
+
+        tareas = []
+        for nombre in self.modelos:
+            tareas.append((nombre, None, None))
+            tareas.extend((nombre, entrenamiento, validacion) for entrenamiento, validacion in folds)
+
+        n_workers = min(n_procesos, len(tareas))
+        n_hilos = max(1, n_procesos // n_workers)
+        print(f"⚙️  {len(tareas)} ajustes en {n_workers} procesos x {n_hilos} hilos")
+
+        salidas = Parallel(n_jobs=n_workers, max_nbytes='1M', mmap_mode='r')(
+            delayed(_ajustar_tarea)(self.modelos[nombre], X, y, entrenamiento, validacion, n_hilos)
+            for nombre, entrenamiento, validacion in tareas
+        )
+
+        ajustados = {}
+        cv_scores = {nombre: [] for nombre in self.modelos}
+        for (nombre, _, validacion), salida in zip(tareas, salidas):
+            if validacion is None:
+                ajustados[nombre] = salida
+            else:
+                cv_scores[nombre].append(salida)
+
+        return ajustados, {nombre: np.array(puntos) for nombre, puntos in cv_scores.items()}
+    
+    def entrenar_modelos(self, X_entrenamiento, X_prueba, y_entrenamiento, y_prueba, n_procesos=1):
         """
-        Entrena y evalúa múltiples modelos
+        Entrena y evalúa múltiples modelos (en paralelo si n_procesos > 1)
         """
         print("🤖 Entrenando modelos...")
         
+        paralelo = n_procesos > 1
+        if paralelo:
+            ajustados, cv_paralelo = self._entrenar_en_paralelo(
+                X_entrenamiento, y_entrenamiento, n_procesos)
+        
         for nombre, modelo in self.modelos.items():
             print(f"\n--- Entrenando {nombre} ---")
             
             # Entrenar modelo
-            modelo.fit(X_entrenamiento, y_entrenamiento)
+            if paralelo:
+                modelo = self.modelos[nombre] = ajustados[nombre]
+            else:
+                modelo.fit(X_entrenamiento, y_entrenamiento)
             
             # Predicciones
             y_pred = modelo.predict(X_prueba)
@@ -112,8 +231,11 @@ class EntrenadorModelo:
             accuracy = modelo.score(X_prueba, y_prueba)
             
             # Validación cruzada
-            cv_scores = cross_val_score(modelo, X_entrenamiento, y_entrenamiento, 
-                                      cv=5, scoring='roc_auc')
+            if paralelo:
+                cv_scores = cv_paralelo[nombre]
+            else:
+                cv_scores = cross_val_score(modelo, X_entrenamiento, y_entrenamiento, 
+                                          cv=5, scoring='roc_auc')
             
             self.resultados[nombre] = {
                 'modelo': modelo,
@@ -129,6 +251,186 @@ class EntrenadorModelo:
             print(f"✅ Accuracy: {accuracy:.4f}")
             print(f"✅ CV AUC: {cv_scores.mean():.4f} (+/- {cv_scores.std() * 2:.4f})")
     
+    def buscar_modelo(self, X_entrenamiento, X_prueba, y_entrenamiento, y_prueba,
+                      presupuesto_segundos=None, max_ajustes=None, eta=3, min_muestras=2000):
+        """
+        Selección de modelo con presupuesto mediante successive halving: todas
+        las configuraciones de ESPACIO_BUSQUEDA (intercaladas por familia) se
+        ajustan con pocas muestras, sobrevive el mejor 1/eta por AUC de
+        validación y los supervivientes reciben eta veces más muestras, hasta
+        usar el conjunto completo. Si se agota el presupuesto (segundos o
+        número de ajustes) se detiene la búsqueda y cuenta el último escalón
+        completo. La mejor configuración se reajusta con todo el conjunto de
+        entrenamiento y es la única que se evalúa. 'cv_mean' guarda su AUC de
+        validación en la búsqueda (no hay validación cruzada) y 'cv_std' queda en 0
+        """
+        print("🔎 Buscando modelo con successive halving...")
+        inicio = time.perf_counter()
+
+        # Validación interna para ordenar candidatos y conjunto de parada
+        # temprana de XGBoost, separados entre sí y del conjunto de prueba
+        X_ajuste, X_val, y_ajuste, y_val = train_test_split(
+            np.asarray(X_entrenamiento), np.asarray(y_entrenamiento),
+            test_size=0.2, random_state=42, stratify=y_entrenamiento
+        )
+        X_ajuste, X_parada, y_ajuste, y_parada = train_test_split(
+            X_ajuste, y_ajuste, test_size=0.1, random_state=42, stratify=y_ajuste
+        )
+
+        # Intercalados por familia: con poco presupuesto se prueban todas las
+        # familias antes de repetir ninguna
+        por_familia = [
+            [(f"{familia} ({', '.join(f'{k}={v}' for k, v in params.items())})", fabrica, params)
+             for params in ParameterGrid(espacio)]
+            for familia, (fabrica, espacio) in ESPACIO_BUSQUEDA.items()
+        ]
+        candidatos = [candidato for grupo in zip_longest(*por_familia)
+                      for candidato in grupo if candidato is not None]
+        configuraciones = {nombre: (fabrica, params) for nombre, fabrica, params in candidatos}
+
+        n_escalones = max(1, int(np.ceil(np.log(len(candidatos)) / np.log(eta))) + 1)
+        muestras = max(min_muestras, int(len(X_ajuste) / eta ** (n_escalones - 1)))
+        ajustes = 0
+        puntuaciones = {}
+        agotado = False
+
+        while True:
+            muestras = min(muestras, len(X_ajuste))
+            print(f"\n--- Escalón: {len(candidatos)} candidatos con {muestras} muestras ---")
+            puntuaciones_escalon = {}
+            modelos_escalon = {}
+
+            for nombre, fabrica, params in candidatos:
+                transcurrido = time.perf_counter() - inicio
+                if ((presupuesto_segundos is not None and transcurrido > presupuesto_segundos) or
+                        (max_ajustes is not None and ajustes >= max_ajustes)):
+                    agotado = True
+                    break
+
+                modelo = fabrica(**params)
+                if isinstance(modelo, XGBClassifier):
+                    modelo.fit(X_ajuste[:muestras], y_ajuste[:muestras],
+                               eval_set=[(X_parada, y_parada)], verbose=False)
+                else:
+                    modelo.fit(X_ajuste[:muestras], y_ajuste[:muestras])
+                ajustes += 1
+
+                puntuaciones_escalon[nombre] = roc_auc_score(y_val, modelo.predict_proba(X_val)[:, 1])
+                modelos_escalon[nombre] = modelo
+
+            if agotado and len(puntuaciones_escalon) < len(candidatos):
+                print("⏱️  Presupuesto agotado, se conserva el último escalón completo")
+                if not puntuaciones:
+                    puntuaciones, modelos = puntuaciones_escalon, modelos_escalon
+                break
+
+            puntuaciones, modelos = puntuaciones_escalon, modelos_escalon
+            if muestras >= len(X_ajuste) or len(candidatos) == 1:
+                break
+
+            # Sobreviven los mejores 1/eta
+            n_supervivientes = max(1, int(np.ceil(len(candidatos) / eta)))
+            candidatos = sorted(candidatos, key=lambda c: puntuaciones[c[0]],
+                                reverse=True)[:n_supervivientes]
+            muestras *= eta
+
+        if not puntuaciones:
+            raise RuntimeError("Presupuesto insuficiente para ajustar ningún candidato")
+
+        print(f"\n🔎 {ajustes} ajustes en {time.perf_counter() - inicio:.1f}s")
+
+        # Reajustar la mejor configuración con todo el conjunto de entrenamiento
+        nombre = max(puntuaciones, key=puntuaciones.get)
+        fabrica, params = configuraciones[nombre]
+        modelo = fabrica(**params)
+        if isinstance(modelo, XGBClassifier):
+            # Sin conjunto de parada: las rondas que eligió la parada temprana
+            modelo.set_params(n_estimators=modelos[nombre].best_iteration + 1,
+                              early_stopping_rounds=None)
+        modelo.fit(np.asarray(X_entrenamiento), np.asarray(y_entrenamiento))
+        print(f"🔁 {nombre} reajustado con {len(X_entrenamiento)} muestras")
+
+        # Evaluar en el conjunto de prueba
+        y_pred = modelo.predict(X_prueba)
+        y_pred_proba = modelo.predict_proba(X_prueba)[:, 1]
+        self.resultados = {nombre: {
+            'modelo': modelo,
+            'auc': roc_auc_score(y_prueba, y_pred_proba),
+            'accuracy': modelo.score(X_prueba, y_prueba),
+            'cv_mean': puntuaciones[nombre],
+            'cv_std': 0.0,
+            'predicciones': y_pred,
+            'probabilidades': y_pred_proba
+        }}
+        print(f"✅ {nombre}: AUC validación {puntuaciones[nombre]:.4f}, "
+              f"AUC prueba {self.resultados[nombre]['auc']:.4f}")
+    
+    def entrenar_fuera_de_memoria(self, almacen, filas_por_bloque=500_000, fraccion_prueba=0.2,
+                                  n_rondas=100, parametros_xgb=None):
+        """
+        Entrena XGBoost leyendo las características del almacén por bloques:
+        el scaler se ajusta con partial_fit, XGBoost usa memoria externa a
+        través de un DataIter y la partición de prueba se decide por bloque.
+        Solo las etiquetas y probabilidades de prueba se mantienen en memoria.
+        Devuelve las etiquetas de prueba; sin validación cruzada, cv_mean y
+        cv_std quedan en None
+        """
+        print("📋 Entrenamiento fuera de memoria...")
+        
+        muestra = next(almacen.iterar_bloques(filas_por_bloque=1))
+        self.columnas_caracteristicas = [col for col in muestra.columns if col not in CARACTERISTICAS_EXCLUIR]
+        self.medias_sensores = almacen.medias_sensores()
+        self.partes_almacen = len(almacen.estado['partes'])
+        argumentos = (almacen, self.columnas_caracteristicas, filas_por_bloque, fraccion_prueba)
+        
+        # Pasada 1: scaler incremental sobre el conjunto de entrenamiento
+        filas_entrenamiento = 0
+        for X, _ in _bloques_particionados(*argumentos, prueba=False):
+            self.scaler.partial_fit(X)
+            filas_entrenamiento += len(X)
+        print(f"📊 Conjunto de entrenamiento: {filas_entrenamiento} filas")
+        
+        # Pasada 2: XGBoost con matriz cuantizada en memoria externa
+        parametros = {'objective': 'binary:logistic', 'eval_metric': 'logloss',
+                      'tree_method': 'hist', 'seed': 42}
+        parametros.update(parametros_xgb or {})
+        iterador = IteradorBloquesXGB(*argumentos, self.scaler,
+                                      os.path.join(almacen.ruta, 'cache_xgb'))
+        if hasattr(xgb, 'ExtMemQuantileDMatrix'):
+            dtrain = xgb.ExtMemQuantileDMatrix(iterador)
+        else:
+            dtrain = xgb.QuantileDMatrix(iterador)
+        booster = xgb.train(parametros, dtrain, num_boost_round=n_rondas)
+        del dtrain
+        
+        modelo = XGBClassifier()
+        modelo.load_model(bytearray(booster.save_raw('ubj')))
+        
+        # Pasada 3: evaluación por bloques sobre la partición de prueba
+        etiquetas, probabilidades = [], []
+        for X, y in _bloques_particionados(*argumentos, prueba=True, scaler=self.scaler):
+            etiquetas.append(y)
+            probabilidades.append(modelo.predict_proba(X)[:, 1])
+        y_prueba = np.concatenate(etiquetas)
+        y_pred_proba = np.concatenate(probabilidades)
+        y_pred = (y_pred_proba >= 0.5).astype(int)
+        print(f"📊 Conjunto de prueba: {len(y_prueba)} filas")
+        
+        nombre = 'XGBoost (fuera de memoria)'
+        self.resultados = {nombre: {
+            'modelo': modelo,
+            'auc': roc_auc_score(y_prueba, y_pred_proba),
+            'accuracy': float((y_pred == y_prueba).mean()),
+            'cv_mean': None,
+            'cv_std': None,
+            'predicciones': y_pred,
+            'probabilidades': y_pred_proba
+        }}
+        print(f"✅ AUC: {self.resultados[nombre]['auc']:.4f}")
+        print(f"✅ Accuracy: {self.resultados[nombre]['accuracy']:.4f}")
+        
+        return y_prueba
+    
     def seleccionar_mejor_modelo(self):
         """
         Selecciona el mejor modelo basado en AUC
@@ -139,21 +441,36 @@ class EntrenadorModelo:
         print(f"\n🎯 MEJOR MODELO SELECCIONADO: {self.mejor_nombre}")
         print(f"🎯 AUC: {self.resultados[self.mejor_nombre]['auc']:.4f}")
     
-    def guardar_modelo(self, ruta_modelo='../models/modelo_entrenado.pkl'):
+    def entrenar_cascada(self, X_entrenamiento, y_entrenamiento, X_prueba):
         """
-        Guarda el modelo y preprocessing
+        Etapa rápida de la cascada de inferencia (regresión logística),
+        calibrada con las probabilidades del mejor modelo en prueba para que
+        ninguna alerta CRÍTICA ni ADVERTENCIA salga antes del modelo completo
         """
-        os.makedirs('../models', exist_ok=True)
+        print("\n⚡ Calibrando cascada de inferencia...")
         
-        datos_modelo = {
-            'modelo': self.mejor_modelo,
-            'scaler': self.scaler,
-            'columnas_caracteristicas': self.columnas_caracteristicas,
-            'nombre_modelo': self.mejor_nombre,
-            'metricas': self.resultados[self.mejor_nombre]
-        }
+        probabilidades = self.resultados[self.mejor_nombre]['probabilidades']
+        self.cascada = calibrar_cascada(entrenar_etapa_rapida(X_entrenamiento, y_entrenamiento),
+                                        X_prueba, probabilidades)
+        
+        print(f"✅ Umbral de salida temprana: {self.cascada['umbral_salida']:.3g}")
+        print(f"✅ Filas de prueba resueltas por la etapa rápida: "
+              f"{self.cascada['fraccion_salida_calibracion']:.1%}")
+        print(f"✅ Alertas no NORMALES del modelo completo con salida temprana: "
+              f"{self.cascada['no_normales_salida_calibracion']}")
+    
+    def guardar_modelo(self, ruta_modelo='../models/modelo_entrenado.pkl'):
+        """
+        Guarda el artefacto de inferencia: modelo, parámetros del scaler,
+        columnas, métricas escalares, medias de sensores de entrenamiento y
+        partes del almacén de características ya usadas
+        """
+        guardar_artefacto(ruta_modelo, self.mejor_modelo, self.scaler,
+                          self.columnas_caracteristicas, self.mejor_nombre,
+                          self.resultados[self.mejor_nombre],
+                          medias_sensores=self.medias_sensores,
+                          cascada=self.cascada, partes_almacen=self.partes_almacen)
         
-        joblib.dump(datos_modelo, ruta_modelo)
         print(f"💾 Modelo guardado en: {ruta_modelo}")
     
     def evaluar_modelos(self, X_prueba, y_prueba):
@@ -220,24 +537,65 @@ class EntrenadorModelo:
         print(f"\n📊 REPORTE DE CLASIFICACIÓN - {self.mejor_nombre}:")
         print(classification_report(y_prueba, mejor_resultado['predicciones']))
 
-def main():
+def main_fuera_de_memoria(ruta_almacen='../data/almacen_caracteristicas', filas_por_bloque=500_000):
+    """
+    Entrenamiento para datasets mayores que la memoria: el almacén de
+    características se actualiza bloque a bloque y el modelo se entrena
+    leyendo bloques del almacén
+    """
+    print("🚀 INICIANDO ENTRENAMIENTO FUERA DE MEMORIA")
+    
+    almacen = AlmacenCaracteristicas(ruta_almacen)
+    for bloque in iterar_bloques(filas_por_bloque=filas_por_bloque):
+        almacen.actualizar(bloque)
+    
+    entrenador = EntrenadorModelo()
+    y_prueba = entrenador.entrenar_fuera_de_memoria(almacen, filas_por_bloque)
+    entrenador.seleccionar_mejor_modelo()
+    entrenador.evaluar_modelos(None, y_prueba)
+    entrenador.guardar_modelo()
+    
+    print("\n✅ ENTRENAMIENTO COMPLETADO")
+
+def main(ruta_almacen=None, n_procesos=1, presupuesto_busqueda=None):
     """
     Función principal para entrenar el modelo
     """
     print("🚀 INICIANDO ENTRENAMIENTO DEL MODELO")
     
-    # Cargar datos
-    df = pd.read_csv('../data/datos_sinteticos.csv')
+    # Cargar datos (formato binario tipado si está disponible)
+    df = cargar_dataset()
     
     # Entrenar modelo
     entrenador = EntrenadorModelo()
-    X_entrenamiento, X_prueba, y_entrenamiento, y_prueba = entrenador.preparar_datos(df)
-    entrenador.entrenar_modelos(X_entrenamiento, X_prueba, y_entrenamiento, y_prueba)
+    almacen = AlmacenCaracteristicas(ruta_almacen) if ruta_almacen else None
+    X_entrenamiento, X_prueba, y_entrenamiento, y_prueba = entrenador.preparar_datos(df, almacen)
+    if presupuesto_busqueda is not None:
+        entrenador.buscar_modelo(X_entrenamiento, X_prueba, y_entrenamiento, y_prueba,
+                                 presupuesto_segundos=presupuesto_busqueda)
+    else:
+        entrenador.entrenar_modelos(X_entrenamiento, X_prueba, y_entrenamiento, y_prueba, n_procesos)
     entrenador.seleccionar_mejor_modelo()
+    entrenador.entrenar_cascada(X_entrenamiento, y_entrenamiento, X_prueba)
     entrenador.evaluar_modelos(X_prueba, y_prueba)
     entrenador.guardar_modelo()
     
     print("\n✅ ENTRENAMIENTO COMPLETADO")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Entrenamiento del modelo de mantenimiento predictivo")
+    parser.add_argument('--almacen', nargs='?', const='../data/almacen_caracteristicas', default=None,
+                        help="Usar el almacén de características incremental (ruta opcional)")
+    parser.add_argument('--procesos', type=int, default=1,
+                        help="Presupuesto de CPU para entrenar modelos y folds en paralelo (0 = todos)")
+    parser.add_argument('--busqueda', type=float, default=None, metavar='SEGUNDOS',
+                        help="Seleccionar modelo con successive halving dentro de este presupuesto")
+    parser.add_argument('--fuera-de-memoria', action='store_true',
+                        help="Entrenar XGBoost por bloques desde el almacén de características")
+    parser.add_argument('--filas-por-bloque', type=int, default=500_000)
+    args = parser.parse_args()
+
+    if args.fuera_de_memoria:
+        main_fuera_de_memoria(args.almacen or '../data/almacen_caracteristicas', args.filas_por_bloque)
+    else:
+        main(args.almacen, args.procesos or os.cpu_count(), args.busqueda)
\ No newline at end of file
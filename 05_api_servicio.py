@@ -1,14 +1,21 @@
 # Librerías para la API
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-import uvicorn
+import os
+import asyncio
+import argparse
 import pandas as pd
-from typing import List, Optional
+from typing import List, Optional, Literal
 import json
 from datetime import datetime
 
 # Importar nuestro sistema de predicción
 from sistema_prediccion import SistemaMantenimientoPredictivo
+from microlotes import DespachadorMicrolotes
+from ejecutor_inferencia import EjecutorInferencia, ColaSaturada
+from servidor_prefork import servir_prefork
+from presupuesto_hilos import PresupuestoHilos
+from registro_modelos import RegistroModelos
 
 # Inicializar FastAPI
 app = FastAPI(
@@ -17,14 +24,183 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Registro de versiones del modelo: se sirve la versión activa y, si el
+# registro está vacío, el modelo fijo de ../models
+RUTA_MODELO = '../models/modelo_entrenado.pkl'
+registro = RegistroModelos(os.environ.get('REGISTRO_MODELOS', '../models/registro'))
+
+def _cargar_sistema(version):
+    ruta_modelo = registro.ruta_version(version) if version else RUTA_MODELO
+    return SistemaMantenimientoPredictivo(ruta_modelo,
+                                          backend=os.environ.get('BACKEND_INFERENCIA', 'sklearn'),
+                                          cascada=os.environ.get('CASCADA', '0') == '1')
+
+def _activar_cache(sistema):
+    # Caché opcional de predicciones individuales (CACHE_PREDICCIONES=1); la
+    # precisión de cuantización por columna se ajusta con CACHE_PASOS (JSON)
+    if os.environ.get('CACHE_PREDICCIONES', '0') == '1':
+        sistema.activar_cache(
+            max_entradas=int(os.environ.get('CACHE_MAX_ENTRADAS', 10_000)),
+            ttl_segundos=float(os.environ.get('CACHE_TTL', 60)),
+            pasos=json.loads(os.environ.get('CACHE_PASOS', '{}')),
+            paso_por_defecto=float(os.environ.get('CACHE_PASO', 0.01))
+        )
+
 # Inicializar sistema de predicción
 try:
-    sistema_predictivo = SistemaMantenimientoPredictivo()
-    print("✅ Sistema de predicción inicializado correctamente")
+    version_modelo = registro.version_activa()
+    sistema_predictivo = _cargar_sistema(version_modelo)
+    _activar_cache(sistema_predictivo)
+    print(f"✅ Sistema de predicción inicializado correctamente (versión: {version_modelo or 'sin registro'})")
 except Exception as e:
     print(f"❌ Error al inicializar el sistema: {e}")
+    version_modelo = None
     sistema_predictivo = None
 
+# Presupuesto de hilos: los núcleos de cada worker (WORKERS procesos) se
+# reparten entre peticiones concurrentes e hilos por llamada al modelo
+presupuesto = PresupuestoHilos(n_workers=int(os.environ.get('WORKERS', 1)))
+
+# Inferencia fuera del bucle de eventos: colas separadas para peticiones
+# individuales y para lotes, cada una con su pool de hilos acotado
+ejecutor = EjecutorInferencia(
+    hilos_individual=presupuesto.concurrencia_individual,
+    hilos_lote=presupuesto.concurrencia_lote,
+    max_pendientes_individual=int(os.environ.get('MAX_PENDIENTES_INDIVIDUAL', 1000)),
+    max_pendientes_lote=int(os.environ.get('MAX_PENDIENTES_LOTE', 16))
+)
+
+# Micro-lotes para /predecir: peticiones concurrentes en una sola llamada al
+# modelo (ventana adaptativa de hasta MICROLOTE_ESPERA_MS ms o MICROLOTE_MAX_FILAS filas).
+# Cada micro-lote usa el sistema activo en el momento de ejecutarse
+despachador = DespachadorMicrolotes(
+    lambda registros: sistema_predictivo.predecir_filas(registros),
+    max_filas=int(os.environ.get('MICROLOTE_MAX_FILAS', 64)),
+    max_espera=float(os.environ.get('MICROLOTE_ESPERA_MS', 2)) / 1000,
+    ejecutar=lambda funcion, registros: ejecutor.ejecutar('individual', funcion, registros)
+)
+
+def aplicar_presupuesto(nuevo_presupuesto):
+    """
+    Aplica el reparto de hilos a las colas de ejecución, a las variantes del
+    backend y a los pools de BLAS/OpenMP
+    """
+    global presupuesto
+    presupuesto = nuevo_presupuesto
+    presupuesto.limitar_bibliotecas()
+    ejecutor.configurar(presupuesto.concurrencia_individual, presupuesto.concurrencia_lote)
+    if sistema_predictivo is not None:
+        sistema_predictivo.configurar_hilos(presupuesto.hilos_intra_individual, presupuesto.hilos_intra_lote)
+
+aplicar_presupuesto(presupuesto)
+
+def _predecir_lote(datos, formato):
+    datos_lista = [fila.dict() for fila in datos]
+    return sistema_predictivo.predecir_lote(pd.DataFrame(datos_lista), formato=formato)
+
+# Lecturas de ejemplo (también para calentar el modelo)
+EJEMPLO_DATOS = {
+    "vibracion": 3.2,
+    "temperatura": 80.0,
+    "presion": 110.0,
+    "corriente": 16.0,
+    "tiempo_desde_mantenimiento": 500,
+    "vibracion_media_10": 3.0,
+    "vibracion_std_10": 0.3,
+    "vibracion_max_10": 3.5,
+    "vibracion_min_10": 2.8,
+    "vibracion_tendencia": 0.1,
+    "temperatura_media_10": 78.0,
+    "temperatura_std_10": 2.0,
+    "temperatura_max_10": 81.0,
+    "temperatura_min_10": 76.0,
+    "temperatura_tendencia": 1.0,
+    "presion_media_10": 105.0,
+    "presion_std_10": 5.0,
+    "presion_max_10": 112.0,
+    "presion_min_10": 100.0,
+    "presion_tendencia": 1.5,
+    "corriente_media_10": 15.5,
+    "corriente_std_10": 0.8,
+    "corriente_max_10": 16.5,
+    "corriente_min_10": 14.8,
+    "corriente_tendencia": 0.3,
+    "indice_degradacion": 1.8,
+    "hora": 14,
+    "dia_semana": 2
+}
+
+# Recarga en caliente: la nueva versión se carga y se calienta aparte y se
+# sustituye con una sola asignación. Las peticiones en curso terminan con el
+# sistema que ya tenían; las siguientes usan el nuevo.
+# Límite con varios workers pre-fork: cada uno carga su propia copia de la
+# nueva versión, que ya no se comparte copy-on-write con el padre, así que
+# la memoria crece en un modelo por worker. Para recuperar el reparto hay
+# que reiniciar el servicio tras activar la versión
+_cerrojo_recarga = asyncio.Lock()
+
+def _preparar_sistema(version, anterior):
+    nuevo = _cargar_sistema(version)
+    nuevo.configurar_hilos(presupuesto.hilos_intra_individual, presupuesto.hilos_intra_lote)
+
+    # Calentar: las primeras llamadas (variantes del backend, sesiones ONNX,
+    # pools de hilos) no deben recaer en las peticiones
+    nuevo.predecir_filas([dict(EJEMPLO_DATOS)] * 8)
+    nuevo.predecir_lote(pd.DataFrame([EJEMPLO_DATOS] * 256), formato='columnar')
+
+    if anterior is not None:
+        # Conservar las ventanas de /ingerir y la caché (se invalida al cambiar)
+        nuevo.motor_caracteristicas.continuar_desde(anterior.motor_caracteristicas)
+        nuevo.cache = anterior.cache
+    else:
+        _activar_cache(nuevo)
+    return nuevo
+
+async def recargar_modelo(version=None, confirmar=None):
+    """
+    Pone en servicio 'version' (por defecto, la activa del registro) si no es
+    la actual. 'confirmar' se llama justo tras el cambio, sin ceder el bucle
+    de eventos, para actualizar el registro de forma consistente
+    """
+    global sistema_predictivo, version_modelo
+    async with _cerrojo_recarga:
+        if version is None:
+            version = registro.version_activa()
+        if version == version_modelo and sistema_predictivo is not None:
+            if confirmar:
+                confirmar()
+            return False
+
+        # Carga y calentamiento en la cola de lotes: respeta el presupuesto de hilos
+        nuevo = await ejecutor.ejecutar('lote', _preparar_sistema, version, sistema_predictivo)
+
+        sistema_predictivo, version_modelo = nuevo, version
+        if confirmar:
+            confirmar()
+        if nuevo.cache is not None:
+            nuevo.cache.invalidar()
+        print(f"🔄 Modelo en servicio: versión {version or 'sin registro'} ({nuevo.nombre_modelo})")
+        if presupuesto.n_workers > 1:
+            print(f"⚠️  Modelo cargado en el worker {os.getpid()} sin compartir con los demás "
+                  f"(reiniciar el servicio para volver a compartirlo)")
+        return True
+
+async def _vigilar_registro(intervalo):
+    # Cada worker sigue el puntero ACTIVO: un cambio hecho por otro worker o
+    # con la línea de comandos se aplica en todos
+    while True:
+        try:
+            await recargar_modelo()
+        except Exception as e:
+            print(f"⚠️  No se pudo cargar la versión activa del registro: {e}")
+        await asyncio.sleep(intervalo)
+
+@app.on_event("startup")
+async def iniciar_vigilancia_registro():
+    intervalo = float(os.environ.get('REGISTRO_INTERVALO', 5))
+    if intervalo > 0:
+        app.state.vigilancia_registro = asyncio.create_task(_vigilar_registro(intervalo))
+
 # Modelos Pydantic para validación de datos
 class DatosSensor(BaseModel):
     vibracion: float
@@ -59,6 +235,28 @@ class DatosSensor(BaseModel):
 class LoteDatosSensor(BaseModel):
     datos: List[DatosSensor]
 
+class LecturaCruda(BaseModel):
+    id_maquina: str
+    fecha_hora: Optional[datetime] = None
+    vibracion: float
+    temperatura: float
+    presion: float
+    corriente: float
+    tiempo_desde_mantenimiento: int
+
+class VersionModelo(BaseModel):
+    version: str
+
+class HistorialCrudo(BaseModel):
+    # Columnar: una lista por columna, todas de la misma longitud
+    id_maquina: List[str]
+    fecha_hora: List[datetime]
+    vibracion: List[float]
+    temperatura: List[float]
+    presion: List[float]
+    corriente: List[float]
+    tiempo_desde_mantenimiento: List[int]
+
 # Endpoints de la API
 @app.get("/")
 async def root():
@@ -99,108 +297,209 @@ async def predecir_falla(datos_sensor: DatosSensor):
         # Convertir a diccionario
         datos_dict = datos_sensor.dict()
         
-        # Realizar predicción
-        resultado = sistema_predictivo.predecir_falla(datos_dict)
+        # Realizar predicción (agrupada con las peticiones concurrentes)
+        resultado = await despachador.enviar(datos_dict)
         
         if resultado['exito']:
             return resultado
         else:
             raise HTTPException(status_code=400, detail=resultado['error'])
             
+    except ColaSaturada as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en la predicción: {str(e)}")
 
 @app.post("/predecir-lote")
-async def predecir_falla_lote(lote_datos: LoteDatosSensor):
+async def predecir_falla_lote(lote_datos: LoteDatosSensor, formato: Literal['filas', 'columnar'] = 'filas'):
     """
-    Endpoint para predecir fallas en lote
+    Endpoint para predecir fallas en lote ('?formato=columnar' para lotes grandes)
     """
     if sistema_predictivo is None:
         raise HTTPException(status_code=503, detail="Sistema de predicción no disponible")
     
     try:
-        # Convertir a DataFrame
-        datos_lista = [datos.dict() for datos in lote_datos.datos]
-        df_lote = pd.DataFrame(datos_lista)
-        
-        # Realizar predicción en lote
-        resultado = sistema_predictivo.predecir_lote(df_lote)
+        # Convertir a DataFrame y predecir en la cola de lotes
+        resultado = await ejecutor.ejecutar('lote', _predecir_lote, lote_datos.datos, formato)
         
         if resultado['exito']:
             return resultado
         else:
             raise HTTPException(status_code=400, detail=resultado['error'])
             
+    except ColaSaturada as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error en la predicción por lote: {str(e)}")
 
+@app.post("/ingerir")
+async def ingerir_lectura(lectura: LecturaCruda):
+    """
+    Endpoint para lecturas crudas: el servicio calcula las características
+    con las ventanas de cada máquina y predice
+    """
+    if sistema_predictivo is None:
+        raise HTTPException(status_code=503, detail="Sistema de predicción no disponible")
+    
+    # Las ventanas de cada máquina viven en el proceso: con varios workers las
+    # lecturas de una máquina se repartirían y sus características serían incorrectas
+    if presupuesto.n_workers > 1:
+        raise HTTPException(status_code=409,
+                            detail="/ingerir requiere un solo worker (las ventanas por máquina no se comparten)")
+    
+    datos_dict = lectura.dict()
+    id_maquina = datos_dict.pop('id_maquina')
+    fecha_hora = datos_dict.pop('fecha_hora') or datetime.now()
+    
+    try:
+        resultado = await ejecutor.ejecutar('individual', sistema_predictivo.ingerir_lectura,
+                                            id_maquina, fecha_hora, datos_dict)
+    except ColaSaturada as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    if resultado['exito']:
+        return resultado
+    else:
+        raise HTTPException(status_code=400, detail=resultado['error'])
+
+@app.post("/predecir-historial")
+async def predecir_historial(historial: HistorialCrudo, formato: Literal['filas', 'columnar'] = 'columnar'):
+    """
+    Endpoint para históricos crudos de varias máquinas: calcula las
+    características en el servidor y predice todas las filas
+    """
+    if sistema_predictivo is None:
+        raise HTTPException(status_code=503, detail="Sistema de predicción no disponible")
+    
+    columnas = historial.dict()
+    if len({len(valores) for valores in columnas.values()}) != 1:
+        raise HTTPException(status_code=400, detail="Todas las columnas del historial deben tener la misma longitud")
+    
+    try:
+        resultado = await ejecutor.ejecutar('lote', sistema_predictivo.predecir_historial, columnas, formato)
+    except ColaSaturada as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    if resultado['exito']:
+        return resultado
+    else:
+        raise HTTPException(status_code=400, detail=resultado['error'])
+
+@app.get("/metricas")
+async def metricas():
+    """
+    Endpoint de métricas de ejecución: profundidad de colas, esperas y micro-lotes
+    """
+    return {
+        "presupuesto_hilos": presupuesto.resumen(),
+        "colas": ejecutor.metricas(),
+        "microlotes": despachador.estadisticas() if despachador else None,
+        "cache": sistema_predictivo.cache.estadisticas() if sistema_predictivo and sistema_predictivo.cache else None,
+        "cascada": sistema_predictivo.cascada.estadisticas() if sistema_predictivo and sistema_predictivo.cascada else None,
+        "timestamp": datetime.now().isoformat()
+    }
+
 @app.get("/info-modelo")
 async def info_modelo():
     """
     Endpoint para obtener información del modelo
     """
-    if sistema_predictivo is None:
+    sistema = sistema_predictivo
+    if sistema is None:
         raise HTTPException(status_code=503, detail="Sistema de predicción no disponible")
     
     return {
-        "nombre_modelo": sistema_predictivo.nombre_modelo,
+        "nombre_modelo": sistema.nombre_modelo,
+        "version_modelo": version_modelo,
+        "backend_inferencia": sistema.backend.nombre,
         "metricas": {
-            "auc": sistema_predictivo.metricas['auc'],
-            "accuracy": sistema_predictivo.metricas['accuracy'],
-            "cross_validation_mean": sistema_predictivo.metricas['cv_mean'],
-            "cross_validation_std": sistema_predictivo.metricas['cv_std']
+            "auc": sistema.metricas['auc'],
+            "accuracy": sistema.metricas['accuracy'],
+            "cross_validation_mean": sistema.metricas['cv_mean'],
+            "cross_validation_std": sistema.metricas['cv_std']
         },
-        "caracteristicas": sistema_predictivo.columnas_caracteristicas,
-        "total_caracteristicas": len(sistema_predictivo.columnas_caracteristicas),
+        "caracteristicas": sistema.columnas_caracteristicas,
+        "total_caracteristicas": len(sistema.columnas_caracteristicas),
         "umbrales": {
-            "advertencia": sistema_predictivo.umbral_advertencia,
-            "critico": sistema_predictivo.umbral_critico
+            "advertencia": sistema.umbral_advertencia,
+            "critico": sistema.umbral_critico
         }
     }
 
+@app.get("/modelo/versiones")
+async def versiones_modelo():
+    """
+    Endpoint con las versiones del registro y la que está en servicio
+    """
+    return {
+        "versiones": registro.versiones(),
+        "version_activa": registro.version_activa(),
+        "version_en_servicio": version_modelo,
+        "version_anterior": registro.version_anterior()
+    }
+
+@app.post("/modelo/activar")
+async def activar_version(datos: VersionModelo):
+    """
+    Endpoint para poner en servicio una versión del registro sin reiniciar.
+    El puntero del registro solo cambia si la versión carga bien; los demás
+    workers la toman al vigilar el registro
+    """
+    if datos.version not in registro.versiones():
+        raise HTTPException(status_code=404, detail=f"Versión inexistente: {datos.version}")
+    
+    try:
+        await recargar_modelo(datos.version, confirmar=lambda: registro.activar(datos.version))
+    except ColaSaturada as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al cargar la versión {datos.version}: {str(e)}")
+    
+    return await versiones_modelo()
+
+@app.post("/modelo/revertir")
+async def revertir_version():
+    """
+    Endpoint para volver a la versión activa anterior
+    """
+    anterior = registro.version_anterior()
+    if anterior is None:
+        raise HTTPException(status_code=409, detail="No hay versiones anteriores a las que volver")
+    
+    try:
+        await recargar_modelo(anterior, confirmar=registro.revertir)
+    except ColaSaturada as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al cargar la versión {anterior}: {str(e)}")
+    
+    return await versiones_modelo()
+
 # Ejemplo de uso para desarrollo
 @app.get("/ejemplo-datos")
 async def ejemplo_datos():
     """
     Endpoint que retorna un ejemplo de datos para testing
     """
-    ejemplo = {
-        "vibracion": 3.2,
-        "temperatura": 80.0,
-        "presion": 110.0,
-        "corriente": 16.0,
-        "tiempo_desde_mantenimiento": 500,
-        "vibracion_media_10": 3.0,
-        "vibracion_std_10": 0.3,
-        "vibracion_max_10": 3.5,
-        "vibracion_min_10": 2.8,
-        "vibracion_tendencia": 0.1,
-        "temperatura_media_10": 78.0,
-        "temperatura_std_10": 2.0,
-        "temperatura_max_10": 81.0,
-        "temperatura_min_10": 76.0,
-        "temperatura_tendencia": 1.0,
-        "presion_media_10": 105.0,
-        "presion_std_10": 5.0,
-        "presion_max_10": 112.0,
-        "presion_min_10": 100.0,
-        "presion_tendencia": 1.5,
-        "corriente_media_10": 15.5,
-        "corriente_std_10": 0.8,
-        "corriente_max_10": 16.5,
-        "corriente_min_10": 14.8,
-        "corriente_tendencia": 0.3,
-        "indice_degradacion": 1.8,
-        "hora": 14,
-        "dia_semana": 2
-    }
-    
-    return ejemplo
+    return EJEMPLO_DATOS
 
 if __name__ == "__main__":
-    uvicorn.run(
+    parser = argparse.ArgumentParser(description="API de Mantenimiento Predictivo")
+    parser.add_argument('--host', default="0.0.0.0")
+    parser.add_argument('--puerto', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Procesos que comparten el modelo cargado; con más de uno "
+                             "/ingerir no está disponible (ventanas por máquina en cada proceso)")
+    args = parser.parse_args()
+    
+    # Repartir los núcleos entre los workers antes de crearlos
+    aplicar_presupuesto(PresupuestoHilos(n_workers=args.workers))
+    
+    # El modelo ya está cargado: los workers se crean con fork y lo comparten
+    servir_prefork(
         app, 
-        host="0.0.0.0", 
-        port=8000,
+        host=args.host, 
+        puerto=args.puerto,
+        n_workers=args.workers,
         log_level="info"
     )
\ No newline at end of file
@@ -0,0 +1,143 @@
+# Actualización incremental del modelo con datos nuevos (sin reentrenar desde cero)
+import copy
+import argparse
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.metrics import roc_auc_score, log_loss
+from xgboost import XGBClassifier
+
+from formato_datos import iterar_bloques
+from almacen_caracteristicas import AlmacenCaracteristicas
+from artefacto_modelo import cargar_artefacto, guardar_artefacto
+from cascada_inferencia import calibrar_cascada
+
+def continuar_entrenamiento(modelo, X, y, rondas_extra=200, arboles_extra=100):
+    """
+    Devuelve una copia del modelo que continúa su entrenamiento con (X, y):
+    rondas de boosting adicionales para XGBoost y Gradient Boosting,
+    árboles adicionales (warm_start) para Random Forest
+    """
+    if isinstance(modelo, XGBClassifier):
+        # Con parada temprana se continúa desde los árboles que el modelo usa
+        # al predecir (hasta best_iteration), y el resultado usa todas las rondas
+        base = modelo.get_booster()
+        mejor_iteracion = base.attr('best_iteration')
+        if mejor_iteracion is not None:
+            base = base[:int(mejor_iteracion) + 1]
+        nuevo = XGBClassifier(**modelo.get_params())
+        nuevo.set_params(n_estimators=rondas_extra, early_stopping_rounds=None)
+        nuevo.fit(X, y, xgb_model=base)
+        nuevo.get_booster().set_attr(best_iteration=None, best_score=None)
+        return nuevo
+
+    if isinstance(modelo, RandomForestClassifier):
+        nuevo = copy.deepcopy(modelo)
+        nuevo.set_params(warm_start=True, n_estimators=len(modelo.estimators_) + arboles_extra)
+        return nuevo.fit(X, y)
+
+    if isinstance(modelo, GradientBoostingClassifier):
+        nuevo = copy.deepcopy(modelo)
+        nuevo.set_params(warm_start=True, n_iter_no_change=None,
+                         n_estimators=modelo.n_estimators_ + rondas_extra)
+        return nuevo.fit(X, y)
+
+    raise ValueError(f"Modelo sin soporte para actualización incremental: {type(modelo).__name__}")
+
+def calidad(modelo, X, y):
+    """
+    AUC si la validación tiene ambas clases; si no, menos log-loss
+    (en ambos casos, mayor es mejor)
+    """
+    probabilidades = modelo.predict_proba(X)[:, 1]
+    if len(np.unique(y)) == 2:
+        return roc_auc_score(y, probabilidades)
+    return -log_loss(y, probabilidades, labels=[0, 1])
+
+def actualizar_modelo(ruta_modelo='../models/modelo_entrenado.pkl',
+                      ruta_almacen='../data/almacen_caracteristicas',
+                      rondas_extra=200, arboles_extra=100,
+                      fraccion_validacion=0.2, tolerancia=0.005):
+    """
+    Incorpora las filas nuevas del dataset al modelo entrenado. Las filas
+    más recientes ('fraccion_validacion' del tiempo nuevo) validan el
+    resultado: el artefacto solo se reemplaza si la calidad no cae más de
+    'tolerancia' respecto al modelo actual
+    """
+    print("🔄 ACTUALIZACIÓN INCREMENTAL DEL MODELO")
+
+    datos_modelo = cargar_artefacto(ruta_modelo)
+    modelo = datos_modelo['modelo']
+    scaler = datos_modelo['scaler']
+    columnas = datos_modelo['columnas_caracteristicas']
+
+    # Solo se calculan características de las filas nuevas
+    almacen = AlmacenCaracteristicas(ruta_almacen)
+    for bloque in iterar_bloques():
+        almacen.actualizar(bloque)
+
+    # El modelo aprende desde la primera parte que aún no ha usado: las filas
+    # de una actualización rechazada siguen pendientes para la siguiente
+    # (un artefacto sin ese dato no ha usado ninguna)
+    desde_parte = datos_modelo.get('partes_almacen') or 0
+    partes_totales = len(almacen.estado['partes'])
+    if desde_parte >= partes_totales:
+        print("✅ Sin datos nuevos, el modelo no cambia")
+        return False
+
+    nuevas = almacen.cargar(desde_parte=desde_parte).sort_values('fecha_hora')
+    n_nuevas = len(nuevas)
+
+    # Hold-out temporal: las filas más recientes validan la actualización
+    corte = nuevas['fecha_hora'].quantile(1 - fraccion_validacion)
+    entrenamiento = nuevas[nuevas['fecha_hora'] <= corte]
+    validacion = nuevas[nuevas['fecha_hora'] > corte]
+    if len(validacion) == 0 or entrenamiento['falla_inminente'].nunique() < 2:
+        print("⚠️  Datos nuevos insuficientes para actualizar y validar")
+        return False
+
+    X_entrenamiento = scaler.transform(entrenamiento[columnas])
+    X_validacion = scaler.transform(validacion[columnas])
+    y_entrenamiento = entrenamiento['falla_inminente'].to_numpy()
+    y_validacion = validacion['falla_inminente'].to_numpy()
+
+    calidad_actual = calidad(modelo, X_validacion, y_validacion)
+    modelo_nuevo = continuar_entrenamiento(modelo, X_entrenamiento, y_entrenamiento,
+                                           rondas_extra, arboles_extra)
+    calidad_nueva = calidad(modelo_nuevo, X_validacion, y_validacion)
+
+    print(f"📊 Filas nuevas: {n_nuevas} ({len(entrenamiento)} entrenamiento, {len(validacion)} validación)")
+    print(f"📊 Calidad en validación reciente: actual {calidad_actual:.4f}, actualizado {calidad_nueva:.4f}")
+
+    if calidad_nueva < calidad_actual - tolerancia:
+        print("❌ La calidad empeora, se conserva el modelo actual")
+        return False
+
+    metricas = dict(datos_modelo['metricas'])
+    metricas['actualizaciones'] = metricas.get('actualizaciones', 0) + 1
+    metricas['calidad_validacion_reciente'] = calidad_nueva
+
+    # La cascada se recalibra con el modelo actualizado
+    cascada = datos_modelo.get('cascada')
+    if cascada is not None:
+        cascada = calibrar_cascada(cascada['modelo'], X_validacion,
+                                   modelo_nuevo.predict_proba(X_validacion)[:, 1])
+
+    # Escritura atómica: el servicio nunca ve un artefacto a medio escribir
+    guardar_artefacto(ruta_modelo, modelo_nuevo, scaler, columnas, datos_modelo['nombre_modelo'],
+                      metricas, medias_sensores=datos_modelo['medias_sensores'], cascada=cascada,
+                      partes_almacen=partes_totales)
+    print(f"💾 Modelo actualizado guardado en: {ruta_modelo}")
+
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Actualización incremental del modelo entrenado")
+    parser.add_argument('--modelo', default='../models/modelo_entrenado.pkl')
+    parser.add_argument('--almacen', default='../data/almacen_caracteristicas')
+    parser.add_argument('--rondas-extra', type=int, default=200)
+    parser.add_argument('--arboles-extra', type=int, default=100)
+    parser.add_argument('--tolerancia', type=float, default=0.005)
+    args = parser.parse_args()
+
+    actualizar_modelo(args.modelo, args.almacen, args.rondas_extra, args.arboles_extra,
+                      tolerancia=args.tolerancia)
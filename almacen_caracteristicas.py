@@ -0,0 +1,125 @@
+# Almacén incremental de características para el reentrenamiento
+import os
+import numpy as np
+import pandas as pd
+import joblib
+
+from formato_datos import COLUMNAS_SENSORES, convertir_tipos
+from caracteristicas import caracteristicas_rolling, completar_caracteristicas, VENTANA
+
+class AlmacenCaracteristicas:
+    """
+    Persiste en Parquet las características por (id_maquina, fecha_hora).
+    Cada actualización calcula solo las filas nuevas, continuando las
+    ventanas rolling con las últimas lecturas guardadas de cada máquina
+    """
+    def __init__(self, ruta='../data/almacen_caracteristicas'):
+        self.ruta = ruta
+        self.ruta_estado = os.path.join(ruta, 'estado.pkl')
+        os.makedirs(ruta, exist_ok=True)
+
+        if os.path.exists(self.ruta_estado):
+            self.estado = joblib.load(self.ruta_estado)
+        else:
+            self.estado = {
+                'partes': [],
+                'historia': None,
+                'ultima_fecha': {},
+                'sumas_sensores': np.zeros(len(COLUMNAS_SENSORES)),
+                'filas': 0
+            }
+
+    def filas_nuevas(self, df):
+        """
+        Filas posteriores a la última fecha almacenada de su máquina
+        """
+        ids = df['id_maquina'].astype(str)
+        ultima = pd.to_datetime(ids.map(self.estado['ultima_fecha']))
+        return df[ultima.isna().to_numpy() | (df['fecha_hora'] > ultima).to_numpy()]
+
+    def actualizar(self, df):
+        """
+        Calcula y guarda las características de las filas nuevas de 'df'.
+        Devuelve el número de filas añadidas
+        """
+        nuevas = self.filas_nuevas(df)
+        if len(nuevas) == 0:
+            print("📦 Almacén de características al día")
+            return 0
+
+        nuevas = nuevas.assign(id_maquina=nuevas['id_maquina'].astype(str)).reset_index(drop=True)
+
+        # Contexto: últimas lecturas de cada máquina de la ejecución anterior
+        historia = self.estado['historia']
+        if historia is not None:
+            contexto = historia[historia['id_maquina'].isin(nuevas['id_maquina'].unique())]
+        else:
+            contexto = nuevas.iloc[:0][['id_maquina', 'fecha_hora'] + COLUMNAS_SENSORES]
+
+        combinado = pd.concat([contexto, nuevas[contexto.columns]], ignore_index=True)
+        rolling = caracteristicas_rolling(combinado).iloc[len(contexto):].reset_index(drop=True)
+        parte = pd.concat([nuevas, rolling], axis=1)
+
+        # Escribir la nueva parte y después, de forma atómica, el estado que la referencia
+        nombre_parte = f'parte-{len(self.estado["partes"]):06d}.parquet'
+        parte.to_parquet(os.path.join(self.ruta, nombre_parte), index=False)
+
+        columnas_historia = ['id_maquina', 'fecha_hora'] + COLUMNAS_SENSORES
+        if historia is None:
+            historia = nuevas[columnas_historia]
+        else:
+            historia = pd.concat([historia, nuevas[columnas_historia]], ignore_index=True)
+        historia = historia.groupby('id_maquina', sort=False).tail(VENTANA).reset_index(drop=True)
+
+        self.estado['partes'].append(nombre_parte)
+        self.estado['historia'] = historia
+        self.estado['ultima_fecha'].update(
+            nuevas.groupby('id_maquina', sort=False)['fecha_hora'].max().to_dict())
+        self.estado['sumas_sensores'] = (self.estado['sumas_sensores'] +
+                                         nuevas[COLUMNAS_SENSORES].to_numpy(dtype=np.float64).sum(axis=0))
+        self.estado['filas'] += len(nuevas)
+        self._guardar_estado()
+
+        print(f"📦 Almacén de características: {len(nuevas)} filas nuevas "
+              f"({self.estado['filas']} en total)")
+        return len(nuevas)
+
+    def _guardar_estado(self):
+        temporal = self.ruta_estado + '.tmp'
+        joblib.dump(self.estado, temporal)
+        os.replace(temporal, self.ruta_estado)
+
+    def medias_sensores(self):
+        """
+        Medias globales de los sensores sobre todo lo almacenado
+        """
+        medias = self.estado['sumas_sensores'] / self.estado['filas']
+        return dict(zip(COLUMNAS_SENSORES, medias))
+
+    def rutas_partes(self):
+        return [os.path.join(self.ruta, parte) for parte in self.estado['partes']]
+
+    def cargar(self, columnas=None, desde_parte=0):
+        """
+        Lee las características almacenadas (desde la parte 'desde_parte')
+        y completa las que dependen de todo el histórico (índice de
+        degradación) y el relleno de NaN
+        """
+        import pyarrow.parquet as pq
+
+        tabla = pq.read_table(self.rutas_partes()[desde_parte:], columns=columnas, memory_map=True)
+        df_features = convertir_tipos(tabla.to_pandas(split_blocks=True))
+        return completar_caracteristicas(df_features, self.medias_sensores())
+
+    def iterar_bloques(self, filas_por_bloque=500_000, columnas=None):
+        """
+        Recorre las características completas por bloques acotados, sin
+        cargar el almacén en memoria (el relleno de NaN es por bloque)
+        """
+        import pyarrow.dataset as ds
+
+        medias = self.medias_sensores()
+        dataset = ds.dataset(self.rutas_partes(), format='parquet')
+        for lote in dataset.to_batches(columns=columnas, batch_size=filas_por_bloque):
+            if lote.num_rows:
+                yield completar_caracteristicas(convertir_tipos(lote.to_pandas()), medias)
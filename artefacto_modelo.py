@@ -0,0 +1,82 @@
+# Artefacto del modelo: solo lo que necesita la inferencia, con carga rápida
+import os
+import numbers
+import numpy as np
+import joblib
+from sklearn.preprocessing import StandardScaler
+
+FORMATO_ARTEFACTO = 2
+
+def metricas_escalares(metricas):
+    """
+    Se queda con las métricas escalares (AUC, accuracy, CV...), descartando
+    el modelo duplicado y los arrays de predicciones del conjunto de prueba
+    """
+    return {clave: (valor.item() if isinstance(valor, np.generic) else valor)
+            for clave, valor in metricas.items()
+            if valor is None or isinstance(valor, (numbers.Number, str))}
+
+def guardar_artefacto(ruta_modelo, modelo, scaler, columnas_caracteristicas, nombre_modelo,
+                      metricas, medias_sensores=None, **extras):
+    """
+    Guarda el artefacto versionado. Los parámetros del scaler se guardan
+    como arrays (sin el objeto StandardScaler) y las métricas sin los arrays
+    de prueba. La escritura es atómica (fichero temporal + os.replace)
+    """
+    artefacto = {
+        'formato': FORMATO_ARTEFACTO,
+        'modelo': modelo,
+        'scaler_media': np.asarray(scaler.mean_, dtype=np.float64),
+        'scaler_escala': np.asarray(scaler.scale_, dtype=np.float64),
+        'columnas_caracteristicas': list(columnas_caracteristicas),
+        'nombre_modelo': nombre_modelo,
+        'metricas': metricas_escalares(metricas),
+        'medias_sensores': None if medias_sensores is None else
+                           {col: float(media) for col, media in medias_sensores.items()},
+        **extras
+    }
+
+    directorio = os.path.dirname(ruta_modelo)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    temporal = ruta_modelo + '.tmp'
+    joblib.dump(artefacto, temporal)
+    os.replace(temporal, ruta_modelo)
+
+def _reconstruir_scaler(media, escala, columnas):
+    scaler = StandardScaler()
+    scaler.mean_ = media
+    scaler.scale_ = escala
+    scaler.var_ = escala ** 2
+    scaler.n_features_in_ = len(columnas)
+    scaler.feature_names_in_ = np.asarray(columnas, dtype=object)
+    return scaler
+
+def cargar_artefacto(ruta_modelo='../models/modelo_entrenado.pkl', mmap_mode=None):
+    """
+    Carga un artefacto (versionado o del formato anterior) y devuelve un
+    diccionario con modelo, scaler, columnas_caracteristicas, nombre_modelo,
+    metricas (escalares), medias_sensores y los arrays scaler_media y
+    scaler_escala. El modelo se copia en memoria al cargarlo (sklearn y
+    XGBoost no admiten mapear sus árboles); entre procesos se comparte
+    cargándolo antes del fork (servidor_prefork)
+    """
+    artefacto = joblib.load(ruta_modelo, mmap_mode=mmap_mode)
+
+    if artefacto.get('formato') is None:
+        # Formato anterior: scaler serializado y métricas con arrays de prueba
+        scaler = artefacto['scaler']
+        artefacto = {
+            'formato': 1,
+            'modelo': artefacto['modelo'],
+            'scaler_media': np.asarray(scaler.mean_, dtype=np.float64),
+            'scaler_escala': np.asarray(scaler.scale_, dtype=np.float64),
+            'columnas_caracteristicas': list(artefacto['columnas_caracteristicas']),
+            'nombre_modelo': artefacto['nombre_modelo'],
+            'metricas': metricas_escalares(artefacto['metricas']),
+            'medias_sensores': None
+        }
+
+    artefacto['scaler'] = _reconstruir_scaler(artefacto['scaler_media'], artefacto['scaler_escala'],
+                                              artefacto['columnas_caracteristicas'])
+    return artefacto
@@ -0,0 +1,165 @@
+# Backends de inferencia intercambiables para el modelo entrenado
+import copy
+import time
+import numpy as np
+from xgboost import XGBClassifier
+
+class BackendSklearn:
+    """
+    Referencia: predict_proba del estimador sklearn/xgboost
+    """
+    nombre = 'sklearn'
+
+    def __init__(self, modelo, n_caracteristicas):
+        self.modelo = modelo
+        self.n_caracteristicas = n_caracteristicas
+
+    def predecir_proba(self, X):
+        return self.modelo.predict_proba(X)[:, 1]
+
+    def variante(self, n_hilos):
+        """
+        Copia que evalúa con 'n_hilos' hilos. Los árboles de sklearn se
+        comparten (copia superficial); XGBoost necesita su propio booster
+        """
+        if isinstance(self.modelo, XGBClassifier):
+            modelo = XGBClassifier()
+            modelo.load_model(bytearray(self.modelo.get_booster().save_raw('ubj')))
+            modelo.set_params(n_jobs=n_hilos)
+        else:
+            modelo = copy.copy(self.modelo)
+            if hasattr(modelo, 'n_jobs'):
+                modelo.n_jobs = n_hilos
+        return BackendSklearn(modelo, self.n_caracteristicas)
+
+class BackendXGBoost:
+    """
+    Booster nativo de XGBoost con inplace_predict, sin pasar por el wrapper
+    sklearn (respeta la mejor iteración del early stopping)
+    """
+    nombre = 'xgboost'
+
+    def __init__(self, modelo, n_caracteristicas):
+        if not isinstance(modelo, XGBClassifier):
+            raise ValueError(f"El backend xgboost requiere XGBClassifier, no {type(modelo).__name__}")
+        self.booster = modelo.get_booster()
+        try:
+            self.rango_iteraciones = (0, modelo.best_iteration + 1)
+        except AttributeError:
+            self.rango_iteraciones = (0, 0)
+
+    def predecir_proba(self, X):
+        return self.booster.inplace_predict(X, iteration_range=self.rango_iteraciones)
+
+    def variante(self, n_hilos):
+        variante = copy.copy(self)
+        variante.booster = self.booster.copy()
+        variante.booster.set_param({'nthread': n_hilos})
+        return variante
+
+class BackendONNX:
+    """
+    Exportación ONNX del modelo ejecutada con onnxruntime (entrada float32)
+    """
+    nombre = 'onnx'
+
+    def __init__(self, modelo, n_caracteristicas):
+        try:
+            import onnxruntime as rt
+            if isinstance(modelo, XGBClassifier):
+                from onnxmltools import convert_xgboost
+                from onnxmltools.convert.common.data_types import FloatTensorType
+            else:
+                from skl2onnx import convert_sklearn
+                from skl2onnx.common.data_types import FloatTensorType
+        except ImportError as e:
+            raise ImportError("El backend onnx requiere onnxruntime y skl2onnx "
+                              "(y onnxmltools para XGBoost)") from e
+
+        tipos_entrada = [('X', FloatTensorType([None, n_caracteristicas]))]
+        if isinstance(modelo, XGBClassifier):
+            nativo = BackendXGBoost(modelo, n_caracteristicas)
+            inicio, fin = nativo.rango_iteraciones
+            booster = nativo.booster[inicio:fin] if fin else nativo.booster
+            modelo_onnx = convert_xgboost(booster, initial_types=tipos_entrada)
+        else:
+            modelo_onnx = convert_sklearn(modelo, initial_types=tipos_entrada,
+                                          options={'zipmap': False})
+
+        self.modelo_serializado = modelo_onnx.SerializeToString()
+        self._crear_sesion(1)
+
+    def _crear_sesion(self, n_hilos):
+        import onnxruntime as rt
+
+        opciones = rt.SessionOptions()
+        opciones.intra_op_num_threads = n_hilos
+        opciones.inter_op_num_threads = 1
+        self.sesion = rt.InferenceSession(self.modelo_serializado, opciones,
+                                          providers=['CPUExecutionProvider'])
+        self.nombre_entrada = self.sesion.get_inputs()[0].name
+
+    def variante(self, n_hilos):
+        variante = copy.copy(self)
+        variante._crear_sesion(n_hilos)
+        return variante
+
+    def predecir_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        return self.sesion.run(['probabilities'], {self.nombre_entrada: X})[0][:, 1]
+
+BACKENDS = {
+    'sklearn': BackendSklearn,
+    'xgboost': BackendXGBoost,
+    'onnx': BackendONNX
+}
+
+def verificar_backend(backend, referencia, X, tolerancia=1e-5):
+    """
+    Comprueba que el backend da las mismas probabilidades que la referencia
+    """
+    diferencia = np.max(np.abs(np.asarray(backend.predecir_proba(X), dtype=np.float64) -
+                               referencia.predecir_proba(X)))
+    if diferencia > tolerancia:
+        raise ValueError(f"El backend {backend.nombre} difiere de sklearn en {diferencia:.2e}")
+    return diferencia
+
+def _tiempo_por_fila(backend, X, repeticiones=200):
+    inicio = time.perf_counter()
+    for i in range(repeticiones):
+        backend.predecir_proba(X[i % len(X)][None, :])
+    return (time.perf_counter() - inicio) / repeticiones
+
+def crear_backend(nombre, modelo, n_caracteristicas, tolerancia=1e-5, semilla=0):
+    """
+    Construye el backend 'nombre' (o 'auto': el más rápido por fila de los
+    disponibles) y lo verifica contra sklearn con datos en la escala del
+    scaler (normales estándar)
+    """
+    referencia = BackendSklearn(modelo, n_caracteristicas)
+    X_verificacion = np.random.default_rng(semilla).standard_normal((256, n_caracteristicas))
+
+    if nombre != 'auto':
+        if nombre not in BACKENDS:
+            raise ValueError(f"Backend desconocido: {nombre} (disponibles: {', '.join(BACKENDS)})")
+        backend = BACKENDS[nombre](modelo, n_caracteristicas)
+        diferencia = verificar_backend(backend, referencia, X_verificacion, tolerancia)
+        print(f"✅ Backend de inferencia: {backend.nombre} (diferencia máx. {diferencia:.1e})")
+        return backend
+
+    tiempos = {}
+    candidatos = {}
+    for clase in BACKENDS.values():
+        try:
+            backend = clase(modelo, n_caracteristicas)
+            verificar_backend(backend, referencia, X_verificacion, tolerancia)
+        except (ImportError, ValueError, RuntimeError) as e:
+            print(f"⚠️  Backend {clase.nombre} descartado: {e}")
+            continue
+        candidatos[backend.nombre] = backend
+        tiempos[backend.nombre] = _tiempo_por_fila(backend, X_verificacion)
+
+    elegido = min(tiempos, key=tiempos.get)
+    print("⏱️  Tiempo por fila: " + ", ".join(f"{n} {t * 1e6:.0f} µs" for n, t in tiempos.items()))
+    print(f"✅ Backend de inferencia: {elegido}")
+    return candidatos[elegido]
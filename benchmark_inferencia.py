@@ -0,0 +1,61 @@
+# Benchmark del preprocesamiento y la predicción de un solo registro
+import argparse
+import timeit
+import numpy as np
+import pandas as pd
+
+from sistema_prediccion import SistemaMantenimientoPredictivo
+
+def registros_de_prueba(sistema, n_registros=200, semilla=0):
+    """
+    Registros con valores alrededor de la media de entrenamiento de cada columna
+    """
+    rng = np.random.default_rng(semilla)
+    valores = sistema.media_scaler + sistema.escala_scaler * rng.standard_normal(
+        (n_registros, len(sistema.columnas_caracteristicas)))
+    return [dict(zip(sistema.columnas_caracteristicas, fila)) for fila in valores.tolist()]
+
+def medir(funcion, registros, repeticiones=5):
+    """
+    Mejor tiempo medio por registro (µs) de 'repeticiones' pasadas
+    """
+    tiempos = timeit.repeat(lambda: [funcion(r) for r in registros], number=1, repeat=repeticiones)
+    return min(tiempos) / len(registros) * 1e6
+
+def benchmark_inferencia(ruta_modelo='../models/modelo_entrenado.pkl', backend='sklearn', n_registros=200):
+    print("⏱️  BENCHMARK DE INFERENCIA POR REGISTRO")
+    sistema = SistemaMantenimientoPredictivo(ruta_modelo, backend=backend)
+    registros = registros_de_prueba(sistema, n_registros)
+
+    # Ruta anterior: DataFrame de una fila + StandardScaler.transform
+    def preprocesar_dataframe(registro):
+        return sistema.preprocesar_nuevos_datos(pd.DataFrame([registro]))
+
+    def preprocesar_rapido(registro):
+        return sistema.preprocesar_nuevos_datos(registro)
+
+    # El camino rápido debe dar el mismo resultado (también con columnas ausentes)
+    incompleto = dict(list(registros[0].items())[::2])
+    for registro in registros + [incompleto]:
+        np.testing.assert_allclose(preprocesar_rapido(registro), preprocesar_dataframe(registro),
+                                   rtol=1e-12, atol=1e-12)
+    print("✅ El camino rápido coincide con el preprocesamiento con DataFrame")
+
+    tiempo_dataframe = medir(preprocesar_dataframe, registros)
+    tiempo_rapido = medir(preprocesar_rapido, registros)
+    tiempo_prediccion = medir(sistema.predecir_falla, registros)
+
+    print(f"📊 Preprocesamiento con DataFrame: {tiempo_dataframe:8.1f} µs/registro")
+    print(f"📊 Preprocesamiento rápido:        {tiempo_rapido:8.1f} µs/registro "
+          f"({tiempo_dataframe / tiempo_rapido:.0f}x)")
+    print(f"📊 predecir_falla completo:        {tiempo_prediccion:8.1f} µs/registro "
+          f"(backend {sistema.backend.nombre})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de inferencia por registro")
+    parser.add_argument('--modelo', default='../models/modelo_entrenado.pkl')
+    parser.add_argument('--backend', default='sklearn')
+    parser.add_argument('--registros', type=int, default=200)
+    args = parser.parse_args()
+
+    benchmark_inferencia(args.modelo, args.backend, args.registros)
@@ -0,0 +1,90 @@
+# Caché de predicciones para lecturas repetidas o casi idénticas
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+class CachePredicciones:
+    """
+    Caché LRU con caducidad (TTL) de probabilidades de falla. La clave es el
+    vector de características cuantizado con el paso de cada columna
+    ('pasos', por nombre; el resto usa 'paso_por_defecto'), de modo que
+    lecturas casi idénticas comparten resultado. invalidar() la vacía al
+    cambiar de modelo y descarta lo que calculen predicciones ya en curso
+    """
+    def __init__(self, columnas, max_entradas=10_000, ttl_segundos=60.0,
+                 pasos=None, paso_por_defecto=0.01):
+        pasos = pasos or {}
+        self.pasos = np.array([pasos.get(col, paso_por_defecto) for col in columnas], dtype=np.float64)
+        self.max_entradas = max_entradas
+        self.ttl_segundos = ttl_segundos
+
+        self._entradas = OrderedDict()
+        self._cerrojo = threading.Lock()
+        self.generacion = 0
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.caducados = 0
+        self.desalojos = 0
+
+    def claves(self, X):
+        """
+        Una clave (bytes) por fila de X, sin escalar
+        """
+        cuantizado = np.rint(np.asarray(X, dtype=np.float64) / self.pasos).astype(np.int64)
+        return [fila.tobytes() for fila in cuantizado]
+
+    def obtener(self, clave):
+        """
+        Probabilidad guardada para la clave, o None
+        """
+        ahora = time.monotonic()
+        with self._cerrojo:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            caduca, probabilidad = entrada
+            if caduca < ahora:
+                del self._entradas[clave]
+                self.caducados += 1
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return probabilidad
+
+    def guardar(self, clave, probabilidad, generacion):
+        """
+        Guarda una probabilidad calculada con el modelo de 'generacion'
+        (se ignora si la caché se invalidó mientras tanto)
+        """
+        with self._cerrojo:
+            if generacion != self.generacion:
+                return
+            self._entradas[clave] = (time.monotonic() + self.ttl_segundos, probabilidad)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+
+    def invalidar(self):
+        with self._cerrojo:
+            self._entradas.clear()
+            self.generacion += 1
+
+    def estadisticas(self):
+        with self._cerrojo:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'max_entradas': self.max_entradas,
+                'ttl_segundos': self.ttl_segundos,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+                'caducados': self.caducados,
+                'desalojos': self.desalojos,
+                'generacion': self.generacion
+            }
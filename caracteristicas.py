@@ -0,0 +1,264 @@
+# Kernel de características rolling por máquina (compartido por entrenamiento y servicio)
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+
+from formato_datos import COLUMNAS_SENSORES
+
+VENTANA = 10
+PASO_TENDENCIA = 5
+ESTADISTICAS_VENTANA = ['media', 'std', 'max', 'min']
+
+def _posicion_en_grupo(codigos_ordenados):
+    """
+    Posición de cada fila dentro de su grupo (códigos ya ordenados)
+    """
+    n = len(codigos_ordenados)
+    indices = np.arange(n)
+    es_inicio = np.ones(n, dtype=bool)
+    es_inicio[1:] = codigos_ordenados[1:] != codigos_ordenados[:-1]
+    inicio_grupo = np.maximum.accumulate(np.where(es_inicio, indices, 0))
+    return indices - inicio_grupo
+
+def calcular_rolling_por_maquina(ids_maquina, valores, ventana=VENTANA,
+                                 paso_tendencia=PASO_TENDENCIA, parciales=False):
+    """
+    Calcula en una sola pasada media, desviación (ddof=1), máximo y mínimo
+    en ventana móvil y la diferencia a 'paso_tendencia' muestras, para
+    todos los sensores a la vez y por máquina. 'valores' es (n, sensores);
+    los resultados quedan alineados con las filas de entrada y valen NaN
+    mientras la máquina no tiene historia suficiente, o con 'parciales'
+    se calculan con las lecturas disponibles, como VentanaMaquina
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    n, n_sensores = valores.shape
+
+    # Agrupar filas por máquina conservando el orden de llegada
+    codigos, _ = pd.factorize(np.asarray(ids_maquina))
+    orden = np.argsort(codigos, kind='stable')
+    ordenados = valores[orden]
+    posicion = _posicion_en_grupo(codigos[orden])
+
+    resultados = {estadistica: np.full((n, n_sensores), np.nan)
+                  for estadistica in ESTADISTICAS_VENTANA + ['tendencia']}
+
+    # Estadísticas de ventana acumulando los 'ventana' desplazamientos de la
+    # serie (pasadas contiguas sobre memoria, todos los sensores a la vez)
+    if n >= ventana:
+        m = n - ventana + 1
+        desplazadas = [ordenados[j:j + m] for j in range(ventana)]
+        suma = desplazadas[0].copy()
+        maximo = desplazadas[0].copy()
+        minimo = desplazadas[0].copy()
+        for serie in desplazadas[1:]:
+            suma += serie
+            np.maximum(maximo, serie, out=maximo)
+            np.minimum(minimo, serie, out=minimo)
+        media = suma / ventana
+        cuadrados = np.zeros_like(media)
+        for serie in desplazadas:
+            desvio = serie - media
+            cuadrados += desvio * desvio
+
+        destino = slice(ventana - 1, n)
+        resultados['media'][destino] = media
+        resultados['std'][destino] = np.sqrt(cuadrados / (ventana - 1))
+        resultados['max'][destino] = maximo
+        resultados['min'][destino] = minimo
+
+    if n > paso_tendencia:
+        resultados['tendencia'][paso_tendencia:] = ordenados[paso_tendencia:] - ordenados[:-paso_tendencia]
+
+    # Las ventanas que cruzan el inicio de una máquina no son válidas
+    for estadistica in ESTADISTICAS_VENTANA:
+        resultados[estadistica][posicion < ventana - 1] = np.nan
+    resultados['tendencia'][posicion < paso_tendencia] = np.nan
+
+    if parciales:
+        # Arranque: desviación 0 con una sola lectura y tendencia respecto a
+        # la lectura más antigua de la máquina
+        for p in range(min(ventana - 1, n)):
+            filas = np.flatnonzero(posicion == p)
+            if len(filas) == 0:
+                continue
+            disponibles = np.stack([ordenados[filas - j] for j in range(p + 1)])
+            resultados['media'][filas] = disponibles.mean(axis=0)
+            resultados['std'][filas] = disponibles.std(axis=0, ddof=1) if p else 0.0
+            resultados['max'][filas] = disponibles.max(axis=0)
+            resultados['min'][filas] = disponibles.min(axis=0)
+        arranque = np.flatnonzero(posicion < paso_tendencia)
+        resultados['tendencia'][arranque] = ordenados[arranque] - ordenados[arranque - posicion[arranque]]
+
+    # Volver al orden original de las filas
+    for estadistica, ordenado in resultados.items():
+        alineado = np.empty_like(ordenado)
+        alineado[orden] = ordenado
+        resultados[estadistica] = alineado
+
+    return resultados
+
+def caracteristicas_rolling(df, columnas=COLUMNAS_SENSORES, parciales=False):
+    """
+    DataFrame con las columnas {sensor}_media_10, _std_10, _max_10, _min_10
+    y _tendencia, en el orden que espera el modelo y con el índice de 'df'
+    """
+    resultados = calcular_rolling_por_maquina(df['id_maquina'].to_numpy(),
+                                              df[columnas].to_numpy(dtype=np.float64),
+                                              parciales=parciales)
+    salida = {}
+    for j, col in enumerate(columnas):
+        for estadistica in ESTADISTICAS_VENTANA:
+            salida[f'{col}_{estadistica}_{VENTANA}'] = resultados[estadistica][:, j]
+        salida[f'{col}_tendencia'] = resultados['tendencia'][:, j]
+    return pd.DataFrame(salida, index=df.index)
+
+def completar_caracteristicas(df_features, medias_sensores, por_maquina=False):
+    """
+    Añade el índice de degradación (respecto a las medias de entrenamiento),
+    la hora y el día de la semana, y rellena los NaN del arranque de cada
+    máquina (con 'por_maquina', sin tomar valores de otras máquinas)
+    """
+    df_features['indice_degradacion'] = sum(
+        df_features[col] / medias_sensores[col] for col in COLUMNAS_SENSORES
+    )
+
+    # Características de tiempo
+    fechas = pd.to_datetime(df_features['fecha_hora'])
+    df_features['hora'] = fechas.dt.hour
+    df_features['dia_semana'] = fechas.dt.dayofweek
+
+    # Llenar valores NaN
+    if por_maquina:
+        rellenar = df_features.columns.drop('id_maquina')
+        grupos = df_features['id_maquina']
+        df_features[rellenar] = df_features[rellenar].groupby(grupos, sort=False, observed=True).bfill()
+        df_features[rellenar] = df_features[rellenar].groupby(grupos, sort=False, observed=True).ffill()
+        return df_features
+    return df_features.bfill().ffill()
+
+class VentanaMaquina:
+    """
+    Estado streaming de una máquina: buffer circular de las últimas
+    'ventana' lecturas, media y suma de cuadrados de desviaciones móviles
+    (Welford) y colas monótonas para máximo y mínimo; todo O(1) por lectura
+    """
+    def __init__(self, n_sensores, ventana=VENTANA):
+        self.ventana = ventana
+        self.buffer = np.zeros((ventana, n_sensores))
+        self.n = 0
+        self.media = np.zeros(n_sensores)
+        self.m2 = np.zeros(n_sensores)
+        self.maximos = [deque() for _ in range(n_sensores)]
+        self.minimos = [deque() for _ in range(n_sensores)]
+        self.ultima_fecha = None
+
+    def agregar(self, valores):
+        posicion = self.n % self.ventana
+        if self.n < self.ventana:
+            # Ventana creciendo: Welford estándar
+            k = self.n + 1
+            delta = valores - self.media
+            self.media += delta / k
+            self.m2 += delta * (valores - self.media)
+        else:
+            # Ventana llena: sale la lectura más antigua y entra la nueva
+            saliente = self.buffer[posicion]
+            media_anterior = self.media
+            self.media = media_anterior + (valores - saliente) / self.ventana
+            self.m2 += (valores - saliente) * (valores - self.media + saliente - media_anterior)
+        self.buffer[posicion] = valores
+        self.n += 1
+
+        if posicion == self.ventana - 1:
+            # Al completar cada vuelta del buffer se recalcula de forma exacta
+            # para que los errores de redondeo no se acumulen
+            self.media = self.buffer.mean(axis=0)
+            self.m2 = ((self.buffer - self.media) ** 2).sum(axis=0)
+
+        # Colas monótonas (índice, valor): el frente es el máximo/mínimo de la ventana
+        primera_valida = self.n - self.ventana
+        for j, valor in enumerate(valores.tolist()):
+            maximos, minimos = self.maximos[j], self.minimos[j]
+            while maximos and maximos[-1][1] <= valor:
+                maximos.pop()
+            while minimos and minimos[-1][1] >= valor:
+                minimos.pop()
+            maximos.append((self.n - 1, valor))
+            minimos.append((self.n - 1, valor))
+            if maximos[0][0] < primera_valida:
+                maximos.popleft()
+            if minimos[0][0] < primera_valida:
+                minimos.popleft()
+
+    def estadisticas(self, paso_tendencia=PASO_TENDENCIA):
+        """
+        Media, desviación (ddof=1), máximo, mínimo y tendencia actuales.
+        Durante el arranque usa las lecturas disponibles: desviación 0 con
+        una sola lectura y tendencia respecto a la lectura más antigua
+        """
+        k = min(self.n, self.ventana)
+        std = np.sqrt(np.maximum(self.m2, 0.0) / (k - 1)) if k > 1 else np.zeros_like(self.media)
+        atras = min(paso_tendencia, self.n - 1)
+        actual = self.buffer[(self.n - 1) % self.ventana]
+        anterior = self.buffer[(self.n - 1 - atras) % self.ventana]
+        return {
+            'media': self.media,
+            'std': std,
+            'max': np.array([cola[0][1] for cola in self.maximos]),
+            'min': np.array([cola[0][1] for cola in self.minimos]),
+            'tendencia': actual - anterior
+        }
+
+class MotorCaracteristicasStreaming:
+    """
+    Calcula en el servicio las características del modelo a partir de
+    lecturas crudas, una lectura cada vez y por máquina. Con la ventana
+    llena coincide con caracteristicas_rolling + completar_caracteristicas
+    """
+    def __init__(self, medias_sensores, columnas=COLUMNAS_SENSORES, ventana=VENTANA):
+        self.columnas = list(columnas)
+        self.medias = np.array([medias_sensores[col] for col in self.columnas], dtype=np.float32)
+        self.ventana = ventana
+        self.maquinas = {}
+        self._cerrojo = threading.Lock()
+
+    def continuar_desde(self, otro):
+        """
+        Comparte las ventanas de las máquinas (y su cerrojo) con otro motor,
+        para no perder el historial al cambiar de modelo
+        """
+        self.maquinas = otro.maquinas
+        self._cerrojo = otro._cerrojo
+
+    def actualizar(self, id_maquina, fecha_hora, lectura):
+        """
+        Incorpora una lectura cruda (dict con los sensores y el resto de
+        columnas sin transformar) y devuelve el dict de características
+        """
+        # Sensores en float32, como los tipa el cargador del entrenamiento
+        fecha_hora = pd.Timestamp(fecha_hora)
+        valores = np.array([lectura[col] for col in self.columnas], dtype=np.float32)
+
+        with self._cerrojo:
+            estado = self.maquinas.get(id_maquina)
+            if estado is None:
+                estado = self.maquinas[id_maquina] = VentanaMaquina(len(self.columnas), self.ventana)
+            if estado.ultima_fecha is not None and fecha_hora <= estado.ultima_fecha:
+                raise ValueError(f"Lectura de {id_maquina} anterior o igual a la última "
+                                 f"({estado.ultima_fecha.isoformat()})")
+            estado.agregar(valores.astype(np.float64))
+            estado.ultima_fecha = fecha_hora
+            estadisticas = estado.estadisticas()
+            lecturas = estado.n
+
+        caracteristicas = dict(lectura)
+        for j, col in enumerate(self.columnas):
+            for estadistica in ESTADISTICAS_VENTANA:
+                caracteristicas[f'{col}_{estadistica}_{VENTANA}'] = float(estadisticas[estadistica][j])
+            caracteristicas[f'{col}_tendencia'] = float(estadisticas['tendencia'][j])
+        caracteristicas['indice_degradacion'] = float(np.sum(valores / self.medias))
+        caracteristicas['hora'] = fecha_hora.hour
+        caracteristicas['dia_semana'] = fecha_hora.dayofweek
+
+        return caracteristicas, lecturas
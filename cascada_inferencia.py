@@ -0,0 +1,73 @@
+# Inferencia en cascada: etapa lineal barata antes del modelo completo
+import threading
+import numpy as np
+from scipy.special import expit
+from sklearn.linear_model import LogisticRegression
+
+UMBRAL_ADVERTENCIA = 0.3
+
+def entrenar_etapa_rapida(X_entrenamiento, y_entrenamiento):
+    """
+    Regresión logística sobre las características escaladas
+    """
+    return LogisticRegression(max_iter=1000).fit(X_entrenamiento, y_entrenamiento)
+
+def calibrar_cascada(modelo_rapido, X_calibracion, probabilidades_completo,
+                     umbral_advertencia=UMBRAL_ADVERTENCIA, margen=0.9):
+    """
+    Umbral de salida temprana de la etapa rápida: por debajo del menor valor
+    que da a las filas que el modelo completo no considera NORMAL (con un
+    margen), de modo que ninguna ADVERTENCIA ni CRÍTICO de calibración sale
+    antes. Nunca supera el umbral de advertencia, así la salida es NORMAL
+    """
+    rapidas = modelo_rapido.predict_proba(X_calibracion)[:, 1]
+    no_normales = np.asarray(probabilidades_completo) >= umbral_advertencia
+
+    limite = rapidas[no_normales].min() if no_normales.any() else umbral_advertencia
+    umbral_salida = float(min(umbral_advertencia, limite * margen))
+    salidas = rapidas < umbral_salida
+
+    return {
+        'modelo': modelo_rapido,
+        'umbral_salida': umbral_salida,
+        'fraccion_salida_calibracion': float(salidas.mean()),
+        'no_normales_salida_calibracion': int((salidas & no_normales).sum())
+    }
+
+class Cascada:
+    """
+    Evalúa la etapa rápida (producto escalar + sigmoide, sin pasar por
+    sklearn) y solo envía al modelo completo las filas inciertas. Cuenta las
+    salidas tempranas
+    """
+    def __init__(self, cascada):
+        modelo = cascada['modelo']
+        self.coeficientes = np.asarray(modelo.coef_[0], dtype=np.float64)
+        self.intercepto = float(modelo.intercept_[0])
+        self.umbral_salida = cascada['umbral_salida']
+        self.evaluadas = 0
+        self.salidas_tempranas = 0
+        self._cerrojo = threading.Lock()
+
+    def predecir_proba(self, X, backend):
+        rapidas = expit(X @ self.coeficientes + self.intercepto)
+        # Solo salen antes las filas claramente por debajo del umbral (como en
+        # la calibración); las no finitas van al modelo completo
+        inciertas = np.flatnonzero(~(rapidas < self.umbral_salida))
+
+        probabilidades = rapidas
+        if len(inciertas):
+            probabilidades[inciertas] = backend.predecir_proba(X[inciertas])
+
+        with self._cerrojo:
+            self.evaluadas += len(X)
+            self.salidas_tempranas += len(X) - len(inciertas)
+        return probabilidades
+
+    def estadisticas(self):
+        return {
+            'umbral_salida': self.umbral_salida,
+            'evaluadas': self.evaluadas,
+            'salidas_tempranas': self.salidas_tempranas,
+            'fraccion_salida': self.salidas_tempranas / self.evaluadas if self.evaluadas else 0.0
+        }
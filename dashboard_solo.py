@@ -842,44 +842,23 @@ async def predecir_falla_web(request: Request):
         datos = await request.json()
         inicio = datetime.now()
         
-        # DATOS COMPLETOS QUE LA API ESPERA
-        datos_completos = {
+        # LECTURA CRUDA: la API calcula las características rolling por máquina
+        lectura = {
+            "id_maquina": datos.get("id_maquina", "DASHBOARD"),
+            "fecha_hora": inicio.isoformat(),
             "vibracion": datos.get("vibracion", 3.0),
             "temperatura": datos.get("temperatura", 80.0),
             "presion": datos.get("presion", 110.0),
             "corriente": datos.get("corriente", 17.0),
-            "tiempo_desde_mantenimiento": datos.get("tiempo_desde_mantenimiento", 500),
-            "vibracion_media_10": 3.0,
-            "vibracion_std_10": 0.3,
-            "vibracion_max_10": 3.5,
-            "vibracion_min_10": 2.5,
-            "vibracion_tendencia": 0.1,
-            "temperatura_media_10": 78.0,
-            "temperatura_std_10": 2.0,
-            "temperatura_max_10": 80.0,
-            "temperatura_min_10": 76.0,
-            "temperatura_tendencia": 0.5,
-            "presion_media_10": 105.0,
-            "presion_std_10": 5.0,
-            "presion_max_10": 110.0,
-            "presion_min_10": 100.0,
-            "presion_tendencia": 1.0,
-            "corriente_media_10": 16.0,
-            "corriente_std_10": 0.8,
-            "corriente_max_10": 17.0,
-            "corriente_min_10": 15.0,
-            "corriente_tendencia": 0.3,
-            "indice_degradacion": 1.5,
-            "hora": datetime.now().hour,
-            "dia_semana": datetime.now().weekday()
+            "tiempo_desde_mantenimiento": datos.get("tiempo_desde_mantenimiento", 500)
         }
         
-        respuesta = requests.post(f"{API_URL}/predecir", json=datos_completos, timeout=10)
+        respuesta = requests.post(f"{API_URL}/ingerir", json=lectura, timeout=10)
         tiempo_respuesta = (datetime.now() - inicio).total_seconds()
         
         if respuesta.status_code == 200:
             resultado = respuesta.json()
-            sistema_logs.guardar_prediccion(datos_completos, resultado, tiempo_respuesta)
+            sistema_logs.guardar_prediccion(lectura, resultado, tiempo_respuesta)
             
             return {
                 "success": True,
@@ -0,0 +1,114 @@
+# Capa de ejecución: la inferencia fuera del bucle de eventos de la API
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class ColaSaturada(Exception):
+    """
+    La cola de una clase de peticiones alcanzó su máximo de pendientes
+    """
+
+class ColaInferencia:
+    """
+    Pool de hilos acotado para una clase de peticiones, con límite de
+    trabajos pendientes y métricas de profundidad, espera y ejecución.
+    El pool se crea con el primer trabajo
+    """
+    def __init__(self, nombre, hilos, max_pendientes):
+        self.nombre = nombre
+        self.hilos = hilos
+        self.max_pendientes = max_pendientes
+        self._pool = None
+        self._cerrojo = threading.Lock()
+
+        self.pendientes = 0
+        self.en_ejecucion = 0
+        self.completados = 0
+        self.rechazados = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.ejecucion_total = 0.0
+
+    def _obtener_pool(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.hilos,
+                                            thread_name_prefix=f'inferencia-{self.nombre}')
+        return self._pool
+
+    def redimensionar(self, hilos):
+        with self._cerrojo:
+            self.hilos = hilos
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+
+    async def ejecutar(self, funcion, *args):
+        """
+        Ejecuta funcion(*args) en el pool y espera su resultado sin bloquear
+        el bucle de eventos. Lanza ColaSaturada si hay demasiados pendientes
+        """
+        with self._cerrojo:
+            if self.pendientes >= self.max_pendientes:
+                self.rechazados += 1
+                raise ColaSaturada(f"Cola '{self.nombre}' saturada ({self.pendientes} pendientes)")
+            self.pendientes += 1
+        encolado = time.perf_counter()
+
+        def trabajo():
+            inicio = time.perf_counter()
+            with self._cerrojo:
+                self.en_ejecucion += 1
+                espera = inicio - encolado
+                self.espera_total += espera
+                self.espera_maxima = max(self.espera_maxima, espera)
+            try:
+                return funcion(*args)
+            finally:
+                with self._cerrojo:
+                    self.en_ejecucion -= 1
+                    self.pendientes -= 1
+                    self.completados += 1
+                    self.ejecucion_total += time.perf_counter() - inicio
+
+        return await asyncio.get_running_loop().run_in_executor(self._obtener_pool(), trabajo)
+
+    def metricas(self):
+        with self._cerrojo:
+            completados = self.completados
+            return {
+                'hilos': self.hilos,
+                'profundidad': self.pendientes - self.en_ejecucion,
+                'en_ejecucion': self.en_ejecucion,
+                'completados': completados,
+                'rechazados': self.rechazados,
+                'espera_media_ms': self.espera_total / completados * 1000 if completados else 0.0,
+                'espera_maxima_ms': self.espera_maxima * 1000,
+                'ejecucion_media_ms': self.ejecucion_total / completados * 1000 if completados else 0.0
+            }
+
+class EjecutorInferencia:
+    """
+    Colas separadas para predicciones individuales (interactivas) y para
+    lotes, de modo que un lote grande no retrasa las individuales. Se usan
+    hilos: los modelos liberan el GIL al evaluar y se comparten sin copiarse
+    """
+    def __init__(self, hilos_individual=2, hilos_lote=1,
+                 max_pendientes_individual=1000, max_pendientes_lote=16):
+        self.colas = {
+            'individual': ColaInferencia('individual', hilos_individual, max_pendientes_individual),
+            'lote': ColaInferencia('lote', hilos_lote, max_pendientes_lote)
+        }
+
+    def configurar(self, hilos_individual, hilos_lote):
+        """
+        Cambia el tamaño de los pools; los ya creados se recrean al siguiente trabajo
+        """
+        for cola, hilos in (('individual', hilos_individual), ('lote', hilos_lote)):
+            self.colas[cola].redimensionar(hilos)
+
+    async def ejecutar(self, cola, funcion, *args):
+        return await self.colas[cola].ejecutar(funcion, *args)
+
+    def metricas(self):
+        return {nombre: cola.metricas() for nombre, cola in self.colas.items()}
@@ -0,0 +1,319 @@
+# Acumuladores fusionables para el análisis exploratorio por bloques
+import numpy as np
+import pandas as pd
+
+# Rangos físicos fijos para los histogramas (fuera de rango va a los extremos)
+RANGOS_SENSORES = {
+    'vibracion': (0.0, 50.0),
+    'temperatura': (0.0, 400.0),
+    'presion': (0.0, 500.0),
+    'corriente': (0.0, 150.0)
+}
+
+class AcumuladorMomentos:
+    """
+    Media, covarianza, mínimo y máximo por columna con el algoritmo de
+    Welford/Chan: cada bloque se resume y se fusiona con el acumulado
+    """
+    def __init__(self, columnas):
+        self.columnas = list(columnas)
+        d = len(self.columnas)
+        self.n = 0
+        self.media = np.zeros(d)
+        self.m2 = np.zeros((d, d))
+        self.minimo = np.full(d, np.inf)
+        self.maximo = np.full(d, -np.inf)
+
+    def actualizar(self, df):
+        X = df[self.columnas].to_numpy(dtype=np.float64)
+        if len(X) == 0:
+            return
+        otro = AcumuladorMomentos(self.columnas)
+        otro.n = len(X)
+        otro.media = X.mean(axis=0)
+        centrado = X - otro.media
+        otro.m2 = centrado.T @ centrado
+        otro.minimo = X.min(axis=0)
+        otro.maximo = X.max(axis=0)
+        self.fusionar(otro)
+
+    def fusionar(self, otro):
+        if otro.n == 0:
+            return
+        n = self.n + otro.n
+        delta = otro.media - self.media
+        self.media = self.media + delta * (otro.n / n)
+        self.m2 = self.m2 + otro.m2 + np.outer(delta, delta) * (self.n * otro.n / n)
+        self.minimo = np.minimum(self.minimo, otro.minimo)
+        self.maximo = np.maximum(self.maximo, otro.maximo)
+        self.n = n
+
+    def covarianza(self):
+        return self.m2 / (self.n - 1)
+
+    def desviacion(self):
+        return np.sqrt(np.diag(self.covarianza()))
+
+    def correlacion(self):
+        desviacion = self.desviacion()
+        corr = self.covarianza() / np.outer(desviacion, desviacion)
+        return pd.DataFrame(corr, index=self.columnas, columns=self.columnas)
+
+class HistogramaFijo:
+    """
+    Histograma de bordes fijos por clase de falla, con celdas de
+    desbordamiento en ambos extremos
+    """
+    def __init__(self, minimo, maximo, n_bins=5000, n_clases=2):
+        self.minimo = minimo
+        self.maximo = maximo
+        self.n_bins = n_bins
+        self.ancho = (maximo - minimo) / n_bins
+        self.conteos = np.zeros((n_clases, n_bins + 2), dtype=np.int64)
+
+    def actualizar(self, valores, clases):
+        indices = np.floor((np.asarray(valores, dtype=np.float64) - self.minimo) / self.ancho)
+        indices = np.clip(indices, -1, self.n_bins).astype(np.int64) + 1
+        n_celdas = self.n_bins + 2
+        planos = np.bincount(np.asarray(clases, dtype=np.int64) * n_celdas + indices,
+                             minlength=self.conteos.size)
+        self.conteos += planos.reshape(self.conteos.shape)
+
+    def fusionar(self, otro):
+        self.conteos += otro.conteos
+
+    def bordes(self):
+        return self.minimo + self.ancho * np.arange(self.n_bins + 1)
+
+    def reagrupar(self, n_barras=50):
+        """
+        Recorta a la zona con datos y agrupa en unas 'n_barras' barras para graficar
+        """
+        interior = self.conteos[:, 1:-1]
+        ocupadas = np.flatnonzero(interior.sum(axis=0))
+        if len(ocupadas) == 0:
+            return self.bordes()[:2], np.zeros((self.conteos.shape[0], 1), dtype=np.int64)
+        inicio, fin = ocupadas[0], ocupadas[-1] + 1
+        factor = max(1, int(np.ceil((fin - inicio) / n_barras)))
+        n_barras = int(np.ceil((fin - inicio) / factor))
+        recorte = interior[:, inicio:inicio + n_barras * factor]
+        recorte = np.pad(recorte, ((0, 0), (0, n_barras * factor - recorte.shape[1])))
+        conteos = recorte.reshape(recorte.shape[0], n_barras, factor).sum(axis=2)
+        bordes = self.minimo + self.ancho * (inicio + factor * np.arange(conteos.shape[1] + 1))
+        return bordes, conteos
+
+class Histograma2D:
+    """
+    Conteos y fallas en una rejilla fija de dos variables (densidad del scatter)
+    """
+    def __init__(self, rango_x, rango_y, n_bins=400):
+        self.rango_x = rango_x
+        self.rango_y = rango_y
+        self.n_bins = n_bins
+        self.conteos = np.zeros((n_bins, n_bins), dtype=np.int64)
+        self.fallas = np.zeros((n_bins, n_bins), dtype=np.int64)
+
+    def _indices(self, valores, rango):
+        ancho = (rango[1] - rango[0]) / self.n_bins
+        indices = np.floor((np.asarray(valores, dtype=np.float64) - rango[0]) / ancho)
+        return np.clip(indices, 0, self.n_bins - 1).astype(np.int64)
+
+    def actualizar(self, x, y, clases):
+        celdas = self._indices(x, self.rango_x) * self.n_bins + self._indices(y, self.rango_y)
+        tamano = self.n_bins * self.n_bins
+        self.conteos += np.bincount(celdas, minlength=tamano).reshape(self.conteos.shape)
+        self.fallas += np.bincount(celdas, weights=np.asarray(clases, dtype=np.float64),
+                                   minlength=tamano).astype(np.int64).reshape(self.fallas.shape)
+
+    def fusionar(self, otro):
+        self.conteos += otro.conteos
+        self.fallas += otro.fallas
+
+    def bordes(self):
+        return (np.linspace(*self.rango_x, self.n_bins + 1),
+                np.linspace(*self.rango_y, self.n_bins + 1))
+
+class SketchCuantiles:
+    """
+    Sketch de cuantiles fusionable estilo KLL: niveles de compactadores con
+    capacidad 'k'; cada elemento del nivel h representa 2**h observaciones
+    """
+    def __init__(self, k=512, semilla=0):
+        self.k = k
+        self.n = 0
+        self.niveles = [np.empty(0)]
+        self.minimo = np.inf
+        self.maximo = -np.inf
+        self._rng = np.random.default_rng(semilla)
+
+    def actualizar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        if len(valores) == 0:
+            return
+        self.niveles[0] = np.concatenate([self.niveles[0], valores])
+        self.n += len(valores)
+        self.minimo = min(self.minimo, valores.min())
+        self.maximo = max(self.maximo, valores.max())
+        self._compactar()
+
+    def fusionar(self, otro):
+        while len(self.niveles) < len(otro.niveles):
+            self.niveles.append(np.empty(0))
+        for nivel, datos in enumerate(otro.niveles):
+            self.niveles[nivel] = np.concatenate([self.niveles[nivel], datos])
+        self.n += otro.n
+        self.minimo = min(self.minimo, otro.minimo)
+        self.maximo = max(self.maximo, otro.maximo)
+        self._compactar()
+
+    def _compactar(self):
+        nivel = 0
+        while nivel < len(self.niveles):
+            datos = self.niveles[nivel]
+            if len(datos) > self.k:
+                datos = np.sort(datos)
+                resto = datos[len(datos) - len(datos) % 2:]
+                promovidos = datos[self._rng.integers(2):len(datos) - len(resto):2]
+                self.niveles[nivel] = resto
+                if nivel + 1 == len(self.niveles):
+                    self.niveles.append(np.empty(0))
+                self.niveles[nivel + 1] = np.concatenate([self.niveles[nivel + 1], promovidos])
+            nivel += 1
+
+    def _ordenados(self):
+        valores = np.concatenate(self.niveles)
+        pesos = np.concatenate([np.full(len(datos), 2.0 ** nivel)
+                                for nivel, datos in enumerate(self.niveles)])
+        orden = np.argsort(valores, kind='stable')
+        return valores[orden], np.cumsum(pesos[orden])
+
+    def cuantiles(self, qs):
+        valores, acumulado = self._ordenados()
+        if len(valores) == 0:
+            return np.full(len(qs), np.nan)
+        objetivos = np.asarray(qs) * acumulado[-1]
+        indices = np.searchsorted(acumulado, objetivos, side='left')
+        return valores[np.clip(indices, 0, len(valores) - 1)]
+
+    @classmethod
+    def combinar(cls, sketches):
+        combinado = cls(k=sketches[0].k)
+        for sketch in sketches:
+            combinado.fusionar(sketch)
+        return combinado
+
+class PerfilStreaming:
+    """
+    Estadísticas del análisis exploratorio acumuladas bloque a bloque.
+    Dos perfiles calculados sobre bloques distintos se pueden fusionar
+    """
+    def __init__(self, variables, maquina_ejemplo='MAQ_01', filas_serie=200):
+        self.variables = list(variables)
+        self.columnas_correlacion = self.variables + ['falla_inminente', 'tiempo_desde_mantenimiento']
+        self.momentos = AcumuladorMomentos(self.columnas_correlacion)
+        self.histogramas = {
+            var: HistogramaFijo(*RANGOS_SENSORES[var]) for var in self.variables
+        }
+        self.sketches = {
+            (var, clase): SketchCuantiles() for var in self.variables for clase in (0, 1)
+        }
+        self.sketch_tiempo = SketchCuantiles()
+        self.dispersion = Histograma2D(RANGOS_SENSORES['vibracion'], RANGOS_SENSORES['temperatura'])
+        self.fallas_maquina = {}
+        self.maquina_ejemplo = maquina_ejemplo
+        self.filas_serie = filas_serie
+        self.serie_ejemplo = None
+
+    def actualizar(self, df):
+        clases = df['falla_inminente'].to_numpy()
+        self.momentos.actualizar(df)
+
+        for var in self.variables:
+            valores = df[var].to_numpy()
+            self.histogramas[var].actualizar(valores, clases)
+            for clase in (0, 1):
+                self.sketches[(var, clase)].actualizar(valores[clases == clase])
+        self.sketch_tiempo.actualizar(df['tiempo_desde_mantenimiento'].to_numpy())
+
+        self.dispersion.actualizar(df['vibracion'].to_numpy(), df['temperatura'].to_numpy(), clases)
+
+        por_maquina = df.groupby('id_maquina', observed=True)['falla_inminente'].agg(['size', 'sum'])
+        for maquina, (filas, fallas) in por_maquina.iterrows():
+            acumulado = self.fallas_maquina.get(maquina, (0, 0))
+            self.fallas_maquina[maquina] = (acumulado[0] + int(filas), acumulado[1] + int(fallas))
+
+        serie = df.loc[df['id_maquina'] == self.maquina_ejemplo,
+                       ['fecha_hora', 'vibracion', 'temperatura', 'falla_inminente']]
+        self._agregar_serie(serie)
+
+    def _agregar_serie(self, serie):
+        if serie is None or len(serie) == 0:
+            return
+        if self.serie_ejemplo is not None:
+            serie = pd.concat([self.serie_ejemplo, serie])
+        self.serie_ejemplo = serie.sort_values('fecha_hora').tail(self.filas_serie)
+
+    def fusionar(self, otro):
+        self.momentos.fusionar(otro.momentos)
+        for var in self.variables:
+            self.histogramas[var].fusionar(otro.histogramas[var])
+        for clave, sketch in otro.sketches.items():
+            self.sketches[clave].fusionar(sketch)
+        self.sketch_tiempo.fusionar(otro.sketch_tiempo)
+        self.dispersion.fusionar(otro.dispersion)
+        for maquina, (filas, fallas) in otro.fallas_maquina.items():
+            acumulado = self.fallas_maquina.get(maquina, (0, 0))
+            self.fallas_maquina[maquina] = (acumulado[0] + filas, acumulado[1] + fallas)
+        self._agregar_serie(otro.serie_ejemplo)
+        return self
+
+    def tasa_fallas(self):
+        return pd.Series({maquina: fallas / filas
+                          for maquina, (filas, fallas) in self.fallas_maquina.items()},
+                         name='falla_inminente').sort_values()
+
+    def balance_clases(self):
+        total = sum(filas for filas, _ in self.fallas_maquina.values())
+        fallas = sum(f for _, f in self.fallas_maquina.values())
+        return pd.Series({0: (total - fallas) / total, 1: fallas / total},
+                         name='falla_inminente')
+
+    def describir(self):
+        """
+        Equivalente a DataFrame.describe() (cuartiles aproximados por el sketch)
+        """
+        columnas = self.variables + ['tiempo_desde_mantenimiento']
+        indices = [self.momentos.columnas.index(col) for col in columnas]
+        desviacion = self.momentos.desviacion()
+        resumen = {}
+        for col, i in zip(columnas, indices):
+            if col == 'tiempo_desde_mantenimiento':
+                sketch = self.sketch_tiempo
+            else:
+                sketch = SketchCuantiles.combinar([self.sketches[(col, 0)], self.sketches[(col, 1)]])
+            q25, q50, q75 = sketch.cuantiles([0.25, 0.5, 0.75])
+            resumen[col] = [self.momentos.n, self.momentos.media[i], desviacion[i],
+                            self.momentos.minimo[i], q25, q50, q75, self.momentos.maximo[i]]
+        return pd.DataFrame(resumen, index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'])
+
+    def estadisticas_caja(self, var, clase):
+        """
+        Estadísticas para Axes.bxp (bigotes de Tukey acotados al rango observado)
+        """
+        sketch = self.sketches[(var, clase)]
+        q1, mediana, q3 = sketch.cuantiles([0.25, 0.5, 0.75])
+        rango = q3 - q1
+        return {
+            'med': mediana, 'q1': q1, 'q3': q3,
+            'whislo': max(sketch.minimo, q1 - 1.5 * rango),
+            'whishi': min(sketch.maximo, q3 + 1.5 * rango),
+            'fliers': []
+        }
+
+def perfilar_bloque(df, variables, maquina_ejemplo='MAQ_01'):
+    """
+    Perfil de un único bloque (unidad de trabajo para procesamiento en paralelo)
+    """
+    perfil = PerfilStreaming(variables, maquina_ejemplo)
+    perfil.actualizar(df)
+    return perfil
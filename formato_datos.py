@@ -0,0 +1,182 @@
+# Formato binario tipado y cargador común del dataset de sensores
+import os
+import pandas as pd
+
+RUTA_DATOS_CSV = '../data/datos_sinteticos.csv'
+RUTA_DATOS_ARROW = '../data/datos_sinteticos.arrow'
+# Archivo o dataset particionado (directorio), como lo escribe 01_generar_datos.py
+RUTA_DATOS_PARQUET = '../data/datos_sinteticos.parquet'
+
+COLUMNAS_SENSORES = ['vibracion', 'temperatura', 'presion', 'corriente']
+
+# Esquema explícito del dataset (columnas en orden)
+TIPOS_COLUMNAS = {
+    'fecha_hora': 'datetime64[ns]',
+    'id_maquina': 'category',
+    'vibracion': 'float32',
+    'temperatura': 'float32',
+    'presion': 'float32',
+    'corriente': 'float32',
+    'tiempo_desde_mantenimiento': 'int32',
+    'falla_inminente': 'int8',
+    'vida_util_restante': 'float32'
+}
+
+def esquema_arrow():
+    """
+    Esquema Arrow equivalente a TIPOS_COLUMNAS
+    """
+    import pyarrow as pa
+
+    tipos = {
+        'fecha_hora': pa.timestamp('ns'),
+        'id_maquina': pa.dictionary(pa.int32(), pa.string()),
+        'tiempo_desde_mantenimiento': pa.int32(),
+        'falla_inminente': pa.int8()
+    }
+    return pa.schema([
+        (columna, tipos.get(columna, pa.float32())) for columna in TIPOS_COLUMNAS
+    ])
+
+def convertir_tipos(df, categorias_maquinas=None):
+    """
+    Reduce las columnas al esquema compacto (float32, int8, categórico).
+    Con 'categorias_maquinas' el diccionario de id_maquina queda fijo
+    """
+    tipos = {columna: tipo for columna, tipo in TIPOS_COLUMNAS.items()
+             if columna in df.columns and columna != 'id_maquina'}
+    df = df.astype(tipos, copy=False)
+
+    if 'id_maquina' in df.columns:
+        if categorias_maquinas is not None:
+            df['id_maquina'] = pd.Categorical(df['id_maquina'], categories=categorias_maquinas)
+        elif not isinstance(df['id_maquina'].dtype, pd.CategoricalDtype):
+            df['id_maquina'] = df['id_maquina'].astype('category')
+
+    return df
+
+class EscritorArrow:
+    """
+    Escribe bloques en un archivo Arrow IPC (Feather v2) sin compresión,
+    que después se puede abrir con memory-map sin copiar los datos
+    """
+    def __init__(self, ruta_salida, categorias_maquinas):
+        import pyarrow as pa
+
+        self.pa = pa
+        self.ruta_salida = ruta_salida
+        self.categorias_maquinas = list(categorias_maquinas)
+        self.esquema = esquema_arrow()
+        self.escritor = pa.ipc.new_file(ruta_salida, self.esquema)
+
+    def escribir(self, df):
+        df = convertir_tipos(df, self.categorias_maquinas)
+        tabla = self.pa.Table.from_pandas(df[list(TIPOS_COLUMNAS)], schema=self.esquema,
+                                          preserve_index=False)
+        self.escritor.write_table(tabla)
+
+    def cerrar(self):
+        self.escritor.close()
+
+def guardar_dataset(df, ruta=RUTA_DATOS_ARROW):
+    """
+    Guarda un DataFrame completo en el formato binario tipado
+    """
+    categorias = sorted(df['id_maquina'].unique())
+    escritor = EscritorArrow(ruta, categorias)
+    try:
+        escritor.escribir(df)
+    finally:
+        escritor.cerrar()
+
+def _fecha_modificacion(ruta):
+    # Un dataset particionado cuenta desde su último archivo escrito
+    if os.path.isdir(ruta):
+        return max((os.path.getmtime(os.path.join(directorio, archivo))
+                    for directorio, _, archivos in os.walk(ruta) for archivo in archivos),
+                   default=os.path.getmtime(ruta))
+    return os.path.getmtime(ruta)
+
+def ruta_dataset_por_defecto():
+    """
+    Usa el dataset más reciente entre Arrow, Parquet (archivo o
+    particionado) y CSV; a igual fecha, prefiere el formato binario
+    """
+    candidatas = [ruta for ruta in (RUTA_DATOS_ARROW, RUTA_DATOS_PARQUET, RUTA_DATOS_CSV)
+                  if os.path.exists(ruta)]
+    if not candidatas:
+        return RUTA_DATOS_CSV
+    # max() se queda con la primera en caso de empate
+    return max(candidatas, key=_fecha_modificacion)
+
+def _columnas_esquema(df):
+    # Las columnas que solo existen como partición (p. ej. 'fecha') no son del dataset
+    return df[[columna for columna in TIPOS_COLUMNAS if columna in df.columns]]
+
+def cargar_dataset(ruta=None, columnas=None):
+    """
+    Carga el dataset con el esquema tipado, sea cual sea el formato:
+    Arrow IPC (memory-map, sin copia), Parquet (archivo o dataset
+    particionado) o CSV
+    """
+    ruta = ruta or ruta_dataset_por_defecto()
+
+    if ruta.endswith(('.arrow', '.feather')):
+        import pyarrow as pa
+
+        with pa.memory_map(ruta, 'r') as fuente:
+            tabla = pa.ipc.open_file(fuente).read_all()
+        if columnas is not None:
+            tabla = tabla.select(columnas)
+        df = tabla.to_pandas(split_blocks=True)
+
+    elif ruta.endswith('.parquet') or os.path.isdir(ruta):
+        import pyarrow.parquet as pq
+
+        df = pq.read_table(ruta, columns=columnas, memory_map=True).to_pandas(split_blocks=True)
+        if columnas is None:
+            df = _columnas_esquema(df)
+
+    else:
+        tipos = {columna: tipo for columna, tipo in TIPOS_COLUMNAS.items()
+                 if columna != 'fecha_hora'}
+        fechas = ['fecha_hora'] if columnas is None or 'fecha_hora' in columnas else False
+        df = pd.read_csv(ruta, usecols=columnas, dtype=tipos, parse_dates=fechas)
+
+    return convertir_tipos(df)
+
+def iterar_bloques(ruta=None, columnas=None, filas_por_bloque=1_000_000):
+    """
+    Recorre el dataset en bloques de como máximo 'filas_por_bloque' filas
+    (DataFrames ya tipados) sin cargarlo completo en memoria
+    """
+    ruta = ruta or ruta_dataset_por_defecto()
+
+    if ruta.endswith(('.arrow', '.feather')):
+        import pyarrow as pa
+
+        with pa.memory_map(ruta, 'r') as fuente:
+            lector = pa.ipc.open_file(fuente)
+            for i in range(lector.num_record_batches):
+                lote = lector.get_batch(i)
+                if columnas is not None:
+                    lote = lote.select(columnas)
+                for inicio in range(0, lote.num_rows, filas_por_bloque):
+                    yield convertir_tipos(lote.slice(inicio, filas_por_bloque).to_pandas())
+
+    elif ruta.endswith('.parquet') or os.path.isdir(ruta):
+        import pyarrow.dataset as ds
+
+        formato = ds.dataset(ruta, format='parquet', partitioning='hive')
+        for lote in formato.to_batches(columns=columnas, batch_size=filas_por_bloque):
+            if lote.num_rows:
+                df = lote.to_pandas()
+                yield convertir_tipos(df if columnas is not None else _columnas_esquema(df))
+
+    else:
+        tipos = {columna: tipo for columna, tipo in TIPOS_COLUMNAS.items()
+                 if columna != 'fecha_hora'}
+        fechas = ['fecha_hora'] if columnas is None or 'fecha_hora' in columnas else False
+        for df in pd.read_csv(ruta, usecols=columnas, dtype=tipos, parse_dates=fechas,
+                              chunksize=filas_por_bloque):
+            yield convertir_tipos(df)
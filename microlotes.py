@@ -0,0 +1,122 @@
+# Micro-lotes adaptativos para predicciones individuales concurrentes
+import asyncio
+import time
+
+class DespachadorMicrolotes:
+    """
+    Agrupa las peticiones individuales que llegan casi a la vez y las evalúa
+    con una sola llamada a 'funcion_lote' (lista de registros -> lista de
+    resultados). La ventana de espera se adapta a la tasa de llegadas
+    (media móvil exponencial): con poco tráfico no se espera nada, con
+    mucho se espera lo justo para llenar el lote, hasta 'max_espera' segundos.
+    'ejecutar' (corrutina ejecutar(funcion, registros)) permite evaluar el
+    lote fuera del bucle de eventos
+    """
+    def __init__(self, funcion_lote, max_filas=64, max_espera=0.002, suavizado=0.1, ejecutar=None):
+        self.funcion_lote = funcion_lote
+        self.ejecutar = ejecutar
+        self.max_filas = max_filas
+        self.max_espera = max_espera
+        self.suavizado = suavizado
+
+        self.intervalo_medio = None
+        self.ultima_llegada = None
+        self.lotes = 0
+        self.filas = 0
+
+        # La cola y la tarea se crean con el primer envío, dentro del bucle de eventos
+        self._cola = None
+        self._tarea = None
+
+    def tasa_llegadas(self):
+        """
+        Peticiones por segundo estimadas
+        """
+        if not self.intervalo_medio:
+            return 0.0
+        return 1.0 / self.intervalo_medio
+
+    def ventana_actual(self):
+        """
+        Segundos que se espera a más peticiones tras la primera del lote
+        """
+        tasa = self.tasa_llegadas()
+        if tasa * self.max_espera < 1.0:
+            # Poco tráfico: no se espera a nadie
+            return 0.0
+        return min(self.max_espera, (self.max_filas - 1) / tasa)
+
+    def _registrar_llegada(self):
+        ahora = time.perf_counter()
+        if self.ultima_llegada is not None:
+            intervalo = ahora - self.ultima_llegada
+            if self.intervalo_medio is None:
+                self.intervalo_medio = intervalo
+            else:
+                self.intervalo_medio += self.suavizado * (intervalo - self.intervalo_medio)
+        self.ultima_llegada = ahora
+
+    async def enviar(self, registro):
+        """
+        Encola un registro y espera su resultado
+        """
+        if self._tarea is None or self._tarea.done():
+            self._cola = asyncio.Queue()
+            self._tarea = asyncio.get_running_loop().create_task(self._bucle())
+
+        self._registrar_llegada()
+        futuro = asyncio.get_running_loop().create_future()
+        await self._cola.put((registro, futuro))
+        return await futuro
+
+    async def _recoger_lote(self):
+        lote = [await self._cola.get()]
+        limite = time.perf_counter() + self.ventana_actual()
+
+        while len(lote) < self.max_filas:
+            # Lo que ya está en cola entra siempre; después, esperar hasta el límite
+            if not self._cola.empty():
+                lote.append(self._cola.get_nowait())
+                continue
+            restante = limite - time.perf_counter()
+            if restante <= 0:
+                break
+            try:
+                lote.append(await asyncio.wait_for(self._cola.get(), restante))
+            except asyncio.TimeoutError:
+                break
+
+        return lote
+
+    async def _evaluar(self, registros):
+        if self.ejecutar is not None:
+            return await self.ejecutar(self.funcion_lote, registros)
+        return self.funcion_lote(registros)
+
+    async def _bucle(self):
+        while True:
+            lote = await self._recoger_lote()
+            registros = [registro for registro, _ in lote]
+
+            try:
+                resultados = await self._evaluar(registros)
+            except Exception as e:
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+                continue
+
+            self.lotes += 1
+            self.filas += len(lote)
+            for (_, futuro), resultado in zip(lote, resultados):
+                if not futuro.done():
+                    futuro.set_result(resultado)
+
+    def estadisticas(self):
+        return {
+            'lotes': self.lotes,
+            'filas': self.filas,
+            'filas_por_lote': self.filas / self.lotes if self.lotes else 0.0,
+            'tasa_llegadas': self.tasa_llegadas(),
+            'ventana_ms': self.ventana_actual() * 1000
+        }
@@ -0,0 +1,52 @@
+# Presupuesto de hilos del servicio: concurrencia de peticiones vs. hilos por llamada
+import os
+
+def nucleos_disponibles():
+    """
+    Núcleos que puede usar este proceso (respeta la afinidad de CPU)
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+class PresupuestoHilos:
+    """
+    Reparte los núcleos de cada worker entre peticiones concurrentes e hilos
+    dentro de cada llamada al modelo, para que el total de hilos activos no
+    supere los núcleos:
+      - individuales (y micro-lotes): 1 hilo por llamada, varias a la vez
+      - lotes grandes: una llamada cada vez con varios hilos
+    """
+    def __init__(self, n_workers=1, nucleos=None):
+        self.nucleos = nucleos or nucleos_disponibles()
+        self.n_workers = max(1, n_workers)
+        self.nucleos_por_worker = max(1, self.nucleos // self.n_workers)
+
+        self.hilos_intra_lote = max(1, self.nucleos_por_worker // 2)
+        self.concurrencia_lote = 1
+        self.hilos_intra_individual = 1
+        self.concurrencia_individual = max(1, self.nucleos_por_worker - self.hilos_intra_lote)
+
+    def limitar_bibliotecas(self):
+        """
+        Limita a 1 hilo los pools de BLAS/OpenMP que no se configuran por
+        llamada, para que solo los hilos del presupuesto compitan por CPU
+        """
+        try:
+            from threadpoolctl import threadpool_limits
+        except ImportError:
+            print("⚠️  threadpoolctl no disponible: sin límite global de hilos BLAS/OpenMP")
+            return
+        threadpool_limits(limits=1)
+
+    def resumen(self):
+        return {
+            'nucleos': self.nucleos,
+            'workers': self.n_workers,
+            'nucleos_por_worker': self.nucleos_por_worker,
+            'individual': {'concurrencia': self.concurrencia_individual,
+                           'hilos_por_llamada': self.hilos_intra_individual},
+            'lote': {'concurrencia': self.concurrencia_lote,
+                     'hilos_por_llamada': self.hilos_intra_lote}
+        }
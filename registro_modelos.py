@@ -0,0 +1,136 @@
+# Registro de versiones del modelo con puntero a la versión activa
+import os
+import json
+import shutil
+import argparse
+from datetime import datetime
+
+RUTA_REGISTRO = '../models/registro'
+NOMBRE_ARTEFACTO = 'modelo.pkl'
+
+def _escribir_atomico(ruta, contenido):
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        f.write(contenido)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+
+class RegistroModelos:
+    """
+    Directorio con una carpeta por versión (v0001/modelo.pkl, ...), un
+    fichero ACTIVO con la versión en servicio y un historial de las versiones
+    activadas antes, para poder volver atrás. El puntero se cambia con
+    os.replace, así quien lo lee ve siempre la versión anterior o la nueva
+    """
+    def __init__(self, ruta=RUTA_REGISTRO):
+        self.ruta = ruta
+        self.ruta_activo = os.path.join(ruta, 'ACTIVO')
+        self.ruta_historial = os.path.join(ruta, 'historial.json')
+        os.makedirs(ruta, exist_ok=True)
+
+    def versiones(self):
+        return sorted(nombre for nombre in os.listdir(self.ruta)
+                      if nombre.startswith('v') and
+                      os.path.exists(os.path.join(self.ruta, nombre, NOMBRE_ARTEFACTO)))
+
+    def ruta_version(self, version):
+        return os.path.join(self.ruta, version, NOMBRE_ARTEFACTO)
+
+    def version_activa(self):
+        try:
+            with open(self.ruta_activo, encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _historial(self):
+        try:
+            with open(self.ruta_historial, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def version_anterior(self):
+        """
+        Versión a la que volvería revertir(), o None
+        """
+        historial = self._historial()
+        return historial[-1]['version'] if historial else None
+
+    def registrar(self, ruta_artefacto, activar=False):
+        """
+        Copia un artefacto como nueva versión (la carpeta aparece completa
+        de una vez) y opcionalmente la activa
+        """
+        versiones = self.versiones()
+        numero = int(versiones[-1][1:]) + 1 if versiones else 1
+        version = f'v{numero:04d}'
+
+        temporal = os.path.join(self.ruta, f'.{version}.tmp')
+        os.makedirs(temporal, exist_ok=True)
+        shutil.copy2(ruta_artefacto, os.path.join(temporal, NOMBRE_ARTEFACTO))
+        os.replace(temporal, os.path.join(self.ruta, version))
+        print(f"📚 Versión registrada: {version}")
+
+        if activar:
+            self.activar(version)
+        return version
+
+    def activar(self, version):
+        """
+        Apunta ACTIVO a 'version' guardando la anterior en el historial
+        """
+        if not os.path.exists(self.ruta_version(version)):
+            raise ValueError(f"Versión inexistente: {version}")
+
+        anterior = self.version_activa()
+        if anterior == version:
+            return version
+        if anterior is not None:
+            historial = self._historial()
+            historial.append({'version': anterior, 'hasta': datetime.now().isoformat()})
+            _escribir_atomico(self.ruta_historial, json.dumps(historial, indent=2))
+
+        _escribir_atomico(self.ruta_activo, version)
+        print(f"✅ Versión activa: {version}")
+        return version
+
+    def revertir(self):
+        """
+        Vuelve a la versión activa anterior del historial
+        """
+        historial = self._historial()
+        if not historial:
+            raise ValueError("No hay versiones anteriores a las que volver")
+
+        anterior = historial.pop()['version']
+        _escribir_atomico(self.ruta_activo, anterior)
+        _escribir_atomico(self.ruta_historial, json.dumps(historial, indent=2))
+        print(f"↩️  Versión activa: {anterior}")
+        return anterior
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Registro de versiones del modelo")
+    parser.add_argument('--registro', default=RUTA_REGISTRO)
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+    registrar = subcomandos.add_parser('registrar', help="Añadir un artefacto como nueva versión")
+    registrar.add_argument('artefacto', nargs='?', default='../models/modelo_entrenado.pkl')
+    registrar.add_argument('--activar', action='store_true')
+    activar = subcomandos.add_parser('activar', help="Poner en servicio una versión")
+    activar.add_argument('version')
+    subcomandos.add_parser('revertir', help="Volver a la versión activa anterior")
+    subcomandos.add_parser('listar', help="Mostrar las versiones registradas")
+    args = parser.parse_args()
+
+    registro = RegistroModelos(args.registro)
+    if args.comando == 'registrar':
+        registro.registrar(args.artefacto, args.activar)
+    elif args.comando == 'activar':
+        registro.activar(args.version)
+    elif args.comando == 'revertir':
+        registro.revertir()
+    else:
+        activa = registro.version_activa()
+        for version in registro.versiones():
+            print(f"{'➡️ ' if version == activa else '   '} {version}")
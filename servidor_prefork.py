@@ -0,0 +1,80 @@
+# Servicio multiproceso pre-fork: el modelo se carga una vez y los workers lo comparten
+import gc
+import os
+import signal
+import socket
+
+import uvicorn
+
+def _crear_socket(host, puerto, backlog=2048):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, puerto))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def _lanzar_worker(app, sock, log_level):
+    pid = os.fork()
+    if pid == 0:
+        # Worker: atiende peticiones en el socket compartido
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        servidor = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+        servidor.run(sockets=[sock])
+        os._exit(0)
+    return pid
+
+def servir_prefork(app, host='0.0.0.0', puerto=8000, n_workers=None, log_level='info'):
+    """
+    Sirve 'app' con n_workers procesos (por defecto, uno por núcleo) creados
+    con fork después de cargar el modelo en el proceso padre. Los workers
+    comparten las páginas del modelo (copy-on-write tras el fork) y el
+    socket de escucha. Un worker que termina de forma inesperada se vuelve
+    a lanzar
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    if n_workers == 1 or not hasattr(os, 'fork'):
+        uvicorn.run(app, host=host, port=puerto, log_level=log_level)
+        return
+
+    sock = _crear_socket(host, puerto)
+
+    # Congelar los objetos ya creados (modelo incluido) para que el recolector
+    # de basura de los workers no escriba en sus páginas y las duplique
+    gc.collect()
+    gc.freeze()
+
+    workers = {_lanzar_worker(app, sock, log_level) for _ in range(n_workers)}
+    print(f"🚀 Servicio pre-fork en http://{host}:{puerto} con {n_workers} workers "
+          f"(PIDs {', '.join(map(str, sorted(workers)))})")
+
+    deteniendo = False
+
+    def detener(signum, frame):
+        nonlocal deteniendo
+        deteniendo = True
+        if signum == signal.SIGINT:
+            # Ctrl+C ya llega a todo el grupo de procesos
+            return
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, detener)
+    signal.signal(signal.SIGINT, detener)
+
+    while workers:
+        try:
+            pid, estado = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+        if not deteniendo:
+            print(f"⚠️  Worker {pid} terminó (estado {estado}), lanzando uno nuevo")
+            workers.add(_lanzar_worker(app, sock, log_level))
+
+    sock.close()
+    print("🛑 Servicio detenido")
@@ -1,23 +1,72 @@
 # Librerías para el sistema de predicción
 import pandas as pd
 import numpy as np
-import joblib
+import threading
 from datetime import datetime
 
+from artefacto_modelo import cargar_artefacto
+from backends_inferencia import crear_backend
+from caracteristicas import MotorCaracteristicasStreaming, caracteristicas_rolling, completar_caracteristicas
+from formato_datos import COLUMNAS_SENSORES, convertir_tipos
+from cache_predicciones import CachePredicciones
+from cascada_inferencia import Cascada
+
+# Niveles de alerta por código (0, 1, 2) y su recomendación
+NIVELES_ALERTA = ['NORMAL', 'ADVERTENCIA', 'CRÍTICO']
+RECOMENDACIONES = [
+    '✅ Operación normal. Continuar monitoreo rutinario.',
+    '🔶 Programar mantenimiento preventivo. Monitorear estrechamente los parámetros.',
+    '⚠️ MANTENIMIENTO REQUERIDO INMEDIATAMENTE. Parar equipo y realizar mantenimiento correctivo.'
+]
+
 class SistemaMantenimientoPredictivo:
-    def __init__(self, ruta_modelo='../models/modelo_entrenado.pkl'):
+    def __init__(self, ruta_modelo='../models/modelo_entrenado.pkl', backend='sklearn', cascada=False):
         """
-        Inicializa el sistema de predicción cargando el modelo entrenado
+        Inicializa el sistema de predicción cargando el modelo entrenado.
+        'backend' elige la implementación de inferencia: 'sklearn', 'xgboost',
+        'onnx' o 'auto' (la más rápida de las disponibles). Con cascada=True
+        la etapa rápida del artefacto resuelve los casos claramente NORMALES
         """
         print("🔮 Inicializando Sistema de Mantenimiento Predictivo...")
         
         # Cargar modelo y preprocessing
-        datos_modelo = joblib.load(ruta_modelo)
+        datos_modelo = cargar_artefacto(ruta_modelo)
         self.modelo = datos_modelo['modelo']
         self.scaler = datos_modelo['scaler']
         self.columnas_caracteristicas = datos_modelo['columnas_caracteristicas']
         self.nombre_modelo = datos_modelo['nombre_modelo']
         self.metricas = datos_modelo['metricas']
+        self.medias_sensores = datos_modelo['medias_sensores']
+        self.backend = crear_backend(backend, self.modelo, len(self.columnas_caracteristicas))
+        self.backend_individual = self.backend
+        self.backend_lote = self.backend
+        
+        # Camino rápido para un solo registro: índice de columnas, parámetros
+        # del scaler como arrays y un vector preasignado por hilo
+        self.indice_columnas = {col: i for i, col in enumerate(self.columnas_caracteristicas)}
+        self.media_scaler = np.asarray(datos_modelo['scaler_media'], dtype=np.float64)
+        self.escala_scaler = np.asarray(datos_modelo['scaler_escala'], dtype=np.float64)
+        self._local = threading.local()
+        
+        # Características en el servidor a partir de lecturas crudas; el índice
+        # de degradación usa las medias de entrenamiento (o, en artefactos
+        # antiguos, las medias del scaler)
+        self.medias_degradacion = self.medias_sensores or {
+            col: float(self.media_scaler[self.indice_columnas[col]]) for col in COLUMNAS_SENSORES
+        }
+        self.motor_caracteristicas = MotorCaracteristicasStreaming(self.medias_degradacion)
+        
+        # Caché opcional de predicciones individuales (ver activar_cache)
+        self.cache = None
+        
+        # Cascada opcional: etapa rápida antes del modelo completo
+        self.cascada = None
+        if cascada:
+            if datos_modelo.get('cascada') is not None:
+                self.cascada = Cascada(datos_modelo['cascada'])
+                print(f"✅ Cascada activa (umbral de salida {self.cascada.umbral_salida:.3g})")
+            else:
+                print("⚠️  El artefacto no incluye etapa rápida: cascada desactivada")
         
         # Umbrales de alerta
         self.umbral_advertencia = 0.3
@@ -27,15 +76,40 @@ class SistemaMantenimientoPredictivo:
         print(f"✅ AUC del modelo: {self.metricas['auc']:.4f}")
         print(f"✅ Características: {len(self.columnas_caracteristicas)}")
     
+    def configurar_hilos(self, hilos_individual=1, hilos_lote=1):
+        """
+        Variantes del backend con hilos por llamada fijos: pocos para
+        registros individuales y micro-lotes, más para lotes grandes
+        """
+        self.backend_individual = self.backend.variante(hilos_individual)
+        self.backend_lote = self.backend.variante(hilos_lote)
+    
+    def _predecir_proba(self, X, backend):
+        """
+        Probabilidades de filas escaladas, pasando por la cascada si está activa
+        """
+        if self.cascada is not None:
+            return self.cascada.predecir_proba(X, backend)
+        return backend.predecir_proba(X)
+    
+    def activar_cache(self, max_entradas=10_000, ttl_segundos=60.0, pasos=None, paso_por_defecto=0.01):
+        """
+        Activa la caché de predicciones individuales; 'pasos' fija la
+        precisión de cuantización por columna (p. ej. {'temperatura': 0.5})
+        """
+        self.cache = CachePredicciones(self.columnas_caracteristicas, max_entradas, ttl_segundos,
+                                       pasos, paso_por_defecto)
+        return self.cache
+    
     def preprocesar_nuevos_datos(self, datos_sensores):
         """
         Preprocesa nuevos datos de sensores para la predicción
         """
-        # Convertir a DataFrame si es un diccionario
+        # Un solo registro: sin DataFrame (copia: el vector del hilo se reutiliza)
         if isinstance(datos_sensores, dict):
-            df = pd.DataFrame([datos_sensores])
-        else:
-            df = datos_sensores.copy()
+            return self._preprocesar_registro(datos_sensores).copy()
+        
+        df = datos_sensores.copy()
         
         # Asegurar que tenemos todas las columnas necesarias
         for columna in self.columnas_caracteristicas:
@@ -51,85 +125,260 @@ class SistemaMantenimientoPredictivo:
         
         return datos_escalados
     
+    def _vector_registro(self, datos_sensores):
+        """
+        Copia un registro, sin escalar, en el vector preasignado del hilo.
+        Las columnas que faltan valen 0.0
+        """
+        fila = getattr(self._local, 'fila', None)
+        if fila is None:
+            fila = self._local.fila = np.empty((1, len(self.columnas_caracteristicas)))
+        
+        fila.fill(0.0)
+        valores = fila[0]
+        for columna, valor in datos_sensores.items():
+            indice = self.indice_columnas.get(columna)
+            if indice is not None:
+                valores[indice] = valor
+        return fila
+    
+    def _preprocesar_registro(self, datos_sensores):
+        """
+        Escala un registro en el vector preasignado del hilo, con el escalado
+        fusionado (x - media) / escala
+        """
+        fila = self._vector_registro(datos_sensores)
+        fila -= self.media_scaler
+        fila /= self.escala_scaler
+        return fila
+    
+    def _probabilidades_individuales(self, X):
+        """
+        Probabilidades de filas sin escalar (X se escala en el sitio). Con la
+        caché activa solo llegan al modelo las filas sin acierto
+        """
+        if self.cache is None:
+            X -= self.media_scaler
+            X /= self.escala_scaler
+            return self._predecir_proba(X, self.backend_individual)
+        
+        claves = self.cache.claves(X)
+        generacion = self.cache.generacion
+        probabilidades = np.array([self.cache.obtener(clave) for clave in claves], dtype=np.float64)
+        pendientes = np.flatnonzero(np.isnan(probabilidades))
+        
+        if len(pendientes):
+            X_pendiente = X[pendientes]
+            X_pendiente -= self.media_scaler
+            X_pendiente /= self.escala_scaler
+            calculadas = self._predecir_proba(X_pendiente, self.backend_individual)
+            probabilidades[pendientes] = calculadas
+            for indice, probabilidad in zip(pendientes.tolist(), calculadas.tolist()):
+                self.cache.guardar(claves[indice], probabilidad, generacion)
+        
+        return probabilidades
+    
     def predecir_falla(self, datos_sensores):
         """
         Realiza predicción de falla inminente
         """
         try:
-            # Preprocesar datos
-            datos_preprocesados = self.preprocesar_nuevos_datos(datos_sensores)
-            
-            # Realizar predicción
-            probabilidad_falla = self.modelo.predict_proba(datos_preprocesados)[0, 1]
+            if isinstance(datos_sensores, dict):
+                # Camino rápido (y caché) para un solo registro
+                probabilidad_falla = self._probabilidades_individuales(self._vector_registro(datos_sensores))[0]
+            else:
+                # Preprocesar datos
+                datos_preprocesados = self.preprocesar_nuevos_datos(datos_sensores)
+                
+                # Realizar predicción
+                probabilidad_falla = self._predecir_proba(datos_preprocesados, self.backend_individual)[0]
             
             # Generar alerta y recomendación
-            nivel_alerta, recomendacion = self._generar_alerta(probabilidad_falla)
+            return self._resultado_prediccion(float(probabilidad_falla),
+                                              int(self._codigos_alerta(probabilidad_falla)),
+                                              datetime.now().isoformat())
             
+        except Exception as e:
             return {
-                'exito': True,
-                'probabilidad_falla': float(probabilidad_falla),
-                'nivel_alerta': nivel_alerta,
-                'recomendacion': recomendacion,
-                'modelo_utilizado': self.nombre_modelo,
-                'timestamp_prediccion': datetime.now().isoformat(),
-                'umbrales': {
-                    'advertencia': self.umbral_advertencia,
-                    'critico': self.umbral_critico
-                }
+                'exito': False,
+                'error': str(e),
+                'timestamp_prediccion': datetime.now().isoformat()
+            }
+    
+    def _resultado_prediccion(self, probabilidad_falla, codigo_alerta, timestamp):
+        return {
+            'exito': True,
+            'probabilidad_falla': probabilidad_falla,
+            'nivel_alerta': NIVELES_ALERTA[codigo_alerta],
+            'recomendacion': RECOMENDACIONES[codigo_alerta],
+            'modelo_utilizado': self.nombre_modelo,
+            'timestamp_prediccion': timestamp,
+            'umbrales': {
+                'advertencia': self.umbral_advertencia,
+                'critico': self.umbral_critico
             }
+        }
+    
+    def predecir_filas(self, registros):
+        """
+        Predice varios registros individuales (dicts) con una sola llamada
+        al modelo. Devuelve un resultado por registro, con la misma forma
+        que predecir_falla
+        """
+        timestamp = datetime.now().isoformat()
+        try:
+            X = np.zeros((len(registros), len(self.columnas_caracteristicas)))
+            for fila, registro in zip(X, registros):
+                for columna, valor in registro.items():
+                    indice = self.indice_columnas.get(columna)
+                    if indice is not None:
+                        fila[indice] = valor
+            
+            probabilidades = self._probabilidades_individuales(X)
+            codigos = self._codigos_alerta(probabilidades)
             
         except Exception as e:
+            return [{
+                'exito': False,
+                'error': str(e),
+                'timestamp_prediccion': timestamp
+            } for _ in registros]
+        
+        return [self._resultado_prediccion(probabilidad, codigo, timestamp)
+                for probabilidad, codigo in zip(probabilidades.tolist(), codigos.tolist())]
+    
+    def ingerir_lectura(self, id_maquina, fecha_hora, lectura):
+        """
+        Recibe una lectura cruda de una máquina (sensores y tiempo desde
+        mantenimiento), actualiza sus ventanas y predice con las
+        características resultantes
+        """
+        try:
+            caracteristicas, lecturas = self.motor_caracteristicas.actualizar(id_maquina, fecha_hora, lectura)
+        except (KeyError, ValueError, TypeError) as e:
             return {
                 'exito': False,
                 'error': str(e),
                 'timestamp_prediccion': datetime.now().isoformat()
             }
+        
+        resultado = self.predecir_falla(caracteristicas)
+        resultado['id_maquina'] = id_maquina
+        resultado['lecturas_en_ventana'] = min(lecturas, self.motor_caracteristicas.ventana)
+        resultado['ventana_completa'] = lecturas >= self.motor_caracteristicas.ventana
+        return resultado
     
     def _generar_alerta(self, probabilidad):
         """
         Genera nivel de alerta basado en la probabilidad de falla
         """
-        if probabilidad >= self.umbral_critico:
-            return 'CRÍTICO', '⚠️ MANTENIMIENTO REQUERIDO INMEDIATAMENTE. Parar equipo y realizar mantenimiento correctivo.'
-        
-        elif probabilidad >= self.umbral_advertencia:
-            return 'ADVERTENCIA', '🔶 Programar mantenimiento preventivo. Monitorear estrechamente los parámetros.'
-        
-        else:
-            return 'NORMAL', '✅ Operación normal. Continuar monitoreo rutinario.'
+        codigo = int(self._codigos_alerta(probabilidad))
+        return NIVELES_ALERTA[codigo], RECOMENDACIONES[codigo]
+    
+    def _codigos_alerta(self, probabilidades):
+        """
+        Código de nivel de alerta (índice en NIVELES_ALERTA) de cada probabilidad
+        """
+        return np.searchsorted([self.umbral_advertencia, self.umbral_critico],
+                               probabilidades, side='right')
     
-    def predecir_lote(self, datos_lote):
+    def predecir_lote(self, datos_lote, formato='filas'):
         """
-        Realiza predicciones para un lote de datos
+        Realiza predicciones para un lote de datos. Con formato='columnar'
+        devuelve arrays paralelos de probabilidades y códigos de alerta, y
+        las tablas de niveles y recomendaciones, en lugar de un dict por fila
         """
         try:
             # Preprocesar lote
             datos_preprocesados = self.preprocesar_nuevos_datos(datos_lote)
             
             # Predecir probabilidades
-            probabilidades = self.modelo.predict_proba(datos_preprocesados)[:, 1]
+            probabilidades = self._predecir_proba(datos_preprocesados, self.backend_lote)
             
-            resultados = []
-            for i, prob in enumerate(probabilidades):
-                nivel_alerta, recomendacion = self._generar_alerta(prob)
-                
-                resultados.append({
-                    'indice': i,
-                    'probabilidad_falla': float(prob),
-                    'nivel_alerta': nivel_alerta,
-                    'recomendacion': recomendacion
-                })
+            return self._respuesta_lote(probabilidades, formato)
             
+        except Exception as e:
+            return {
+                'exito': False,
+                'error': str(e)
+            }
+    
+    def _respuesta_lote(self, probabilidades, formato, columnas_extra=None):
+        """
+        Niveles y resumen vectorizados; 'columnas_extra' (dict de listas)
+        se añade a la respuesta columnar o a cada fila
+        """
+        columnas_extra = columnas_extra or {}
+        codigos = self._codigos_alerta(probabilidades)
+        conteos = np.bincount(codigos, minlength=len(NIVELES_ALERTA))
+        resumen_alertas = {nivel: int(conteos[codigo])
+                           for codigo, nivel in reversed(list(enumerate(NIVELES_ALERTA)))}
+        
+        if formato == 'columnar':
             return {
                 'exito': True,
+                'formato': 'columnar',
                 'total_registros': len(probabilidades),
-                'predicciones': resultados,
-                'resumen_alertas': {
-                    'CRÍTICO': len([r for r in resultados if r['nivel_alerta'] == 'CRÍTICO']),
-                    'ADVERTENCIA': len([r for r in resultados if r['nivel_alerta'] == 'ADVERTENCIA']),
-                    'NORMAL': len([r for r in resultados if r['nivel_alerta'] == 'NORMAL'])
-                }
+                **columnas_extra,
+                'probabilidad_falla': probabilidades.tolist(),
+                'codigo_alerta': codigos.tolist(),
+                'niveles_alerta': NIVELES_ALERTA,
+                'recomendaciones': RECOMENDACIONES,
+                'resumen_alertas': resumen_alertas
+            }
+        
+        resultados = [{
+            'indice': i,
+            **{columna: valores[i] for columna, valores in columnas_extra.items()},
+            'probabilidad_falla': prob,
+            'nivel_alerta': NIVELES_ALERTA[codigo],
+            'recomendacion': RECOMENDACIONES[codigo]
+        } for i, (prob, codigo) in enumerate(zip(probabilidades.tolist(), codigos.tolist()))]
+        
+        return {
+            'exito': True,
+            'total_registros': len(probabilidades),
+            'predicciones': resultados,
+            'resumen_alertas': resumen_alertas
+        }
+    
+    def caracteristicas_historial(self, historial):
+        """
+        Características de entrenamiento para un histórico crudo de varias
+        máquinas (id_maquina, fecha_hora, sensores y tiempo desde
+        mantenimiento), con el mismo kernel agrupado que 03_entrenar_modelo.py.
+        Las primeras lecturas de cada máquina usan ventanas parciales, como
+        /ingerir. Las filas conservan el orden de entrada
+        """
+        df = convertir_tipos(pd.DataFrame(historial).reset_index(drop=True))
+        df['fecha_hora'] = pd.to_datetime(df['fecha_hora'])
+        
+        # El kernel recorre cada máquina en orden de llegada: ordenar por
+        # máquina y tiempo para que ningún relleno cruce de una máquina a otra
+        df = df.sort_values(['id_maquina', 'fecha_hora'], kind='stable')
+        df_features = pd.concat([df, caracteristicas_rolling(df, parciales=True)], axis=1)
+        df_features = completar_caracteristicas(df_features, self.medias_degradacion, por_maquina=True)
+        return df_features.sort_index()
+    
+    def predecir_historial(self, historial, formato='columnar'):
+        """
+        Calcula en el servidor las características de un histórico crudo
+        (DataFrame o dict de columnas) y predice todas las filas con una sola
+        llamada al modelo
+        """
+        try:
+            df_features = self.caracteristicas_historial(historial)
+            
+            X = df_features[self.columnas_caracteristicas].to_numpy(dtype=np.float64)
+            X -= self.media_scaler
+            X /= self.escala_scaler
+            probabilidades = self._predecir_proba(X, self.backend_lote)
+            
+            columnas_extra = {
+                'id_maquina': df_features['id_maquina'].astype(str).tolist(),
+                'fecha_hora': [fecha.isoformat() for fecha in df_features['fecha_hora']]
             }
+            return self._respuesta_lote(probabilidades, formato, columnas_extra)
             
         except Exception as e:
             return {